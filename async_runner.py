@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+
+from vacuum_world import ExperimentError, NUM_STEPS
+
+
+CONCURRENCY = 64
+
+
+async def run_experiment_async(environment, agent, evaluator,
+                               steps=NUM_STEPS):
+    """
+    Simulate an agent in the environment for a number of steps, like
+    vacuum_world.run_experiment, awaiting the agent's decisions.
+
+    The agent's decide() may be a coroutine function, e.g. one that asks
+    a model server for each action; while it waits, other experiments on
+    the same event loop carry on. A plain decide() works too, but then
+    the experiment never yields to the others.
+
+    :param environment: where the agent must perform
+    :param agent: agent to evaluate
+    :param evaluator: object that scores the agent against the
+      performance measure
+    :param steps: number of time steps to simulate
+    """
+    for t in range(1, steps + 1):
+        try:
+            decision = agent.decide(environment.observable_state)
+            if inspect.isawaitable(decision):
+                decision = await decision
+        # As in run_experiment, ValueError means the agent rejected the
+        # environment's percept.
+        except ValueError as e:
+            raise ExperimentError('environment', e)
+        except Exception as e:
+            raise ExperimentError('agent', e)
+        try:
+            environment.update(decision)
+        except ValueError as e:
+            raise ExperimentError('agent', e)
+        except Exception as e:
+            raise ExperimentError('environment', e)
+        evaluator.update(environment.state)
+
+
+async def run_experiments_async(experiments, steps=NUM_STEPS,
+                                concurrency=CONCURRENCY):
+    """
+    Run many experiments on the running event loop, interleaving them
+    while their agents wait.
+
+    :param experiments: iterable of (environment, agent, evaluator)
+      tuples
+    :param steps: number of time steps per experiment
+    :param concurrency: most experiments in progress at once
+    :return: list with the evaluator's score for each experiment, in
+      the order given
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(environment, agent, evaluator):
+        async with semaphore:
+            await run_experiment_async(environment, agent, evaluator, steps)
+        return evaluator.score
+
+    return await asyncio.gather(*(run(*experiment)
+                                  for experiment in experiments))
+
+
+def run_experiments(experiments, steps=NUM_STEPS, concurrency=CONCURRENCY):
+    """
+    run_experiments_async on a new event loop, for callers that are not
+    themselves asynchronous.
+    """
+    return asyncio.run(run_experiments_async(experiments, steps,
+                                             concurrency))
@@ -0,0 +1,183 @@
+from collections import namedtuple
+
+import numpy as np
+
+from roomba_world import (CELL_DIRTY, CELL_OBSTACLE, CELL_VOID,
+                          MSG_ILLEGAL_ACTION, MSG_INVALID_PARAM,
+                          MSG_WRONG_ARGV_LEN, STR_IMPASSABLE,
+                          STR_OUT_OF_BOUNDS)
+
+
+ACTIONS = ('SUCK', 'UP', 'DOWN', 'LEFT', 'RIGHT')
+SUCK, UP, DOWN, LEFT, RIGHT = range(len(ACTIONS))
+
+_DX = np.array([0, -1, 1, 0, 0])
+_DY = np.array([0, 0, 0, -1, 1])
+
+
+def run_batch_experiment(environment, agent, evaluator, steps=1000):
+    """
+    Simulate a batch of agents in a batch of environments.
+
+    Every step, all worlds are advanced at once with array operations.
+
+    :param environment: BatchRoombaWorld to act in
+    :param agent: batched agent whose decide() maps a
+      BatchRoombaWorld.ObservableState to a vector of action codes
+    :param evaluator: batched evaluator to score every world
+    :param steps: number of time steps to simulate
+    """
+    for _ in range(steps):
+        actions = agent.decide(environment.observable_state)
+        environment.update(actions)
+        evaluator.update(environment.state)
+
+
+class BatchRoombaWorld(object):
+    """
+    N independent Roomba worlds stepped together.
+
+    Floors of different sizes are padded to a common shape with cells
+    that are neither passable nor counted as part of the floor.
+    Actions are integer codes indexing ACTIONS.
+    """
+
+    State = namedtuple('State', ['dirt', 'passable', 'agent_locations',
+                                 'clean_count'])
+    ObservableState = namedtuple('ObservableState', ['agent_locations',
+                                                     'is_dirty'])
+
+    def __init__(self, floor_grids, agent_locations):
+        """
+        Initialize a new batch of environments.
+
+        :param floor_grids: sequence of N roomba_world.FloorGrid
+          objects; the same grid may appear more than once and is
+          copied for each world.
+        :param agent_locations: sequence of N (x, y) starting locations
+        """
+        if len(agent_locations) != len(floor_grids):
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(len(floor_grids),
+                                                       'agent_locations',
+                                                       len(agent_locations)))
+        n = len(floor_grids)
+        height = max((grid.height for grid in floor_grids), default=0)
+        width = max((grid.width for grid in floor_grids), default=0)
+        cells = np.full((n, height, width), CELL_VOID, dtype=np.uint8)
+        for i, grid in enumerate(floor_grids):
+            grid_cells = np.frombuffer(bytes(grid.cells), dtype=np.uint8)
+            cells[i, :grid.height, :grid.width] = \
+                grid_cells.reshape(grid.height, grid.width)
+
+        self._dirt = cells == CELL_DIRTY
+        self._passable = cells < CELL_OBSTACLE
+        self._clean_count = np.array([grid.count_clean()
+                                      for grid in floor_grids],
+                                     dtype=np.int64)
+        self._worlds = np.arange(n)
+        self._x, self._y = self._initialize_agent_locations(agent_locations)
+
+    @property
+    def state(self):
+        return BatchRoombaWorld.State(dirt=self._dirt,
+                                      passable=self._passable,
+                                      agent_locations=self.agent_locations,
+                                      clean_count=self._clean_count)
+
+    @property
+    def observable_state(self):
+        is_dirty = self._dirt[self._worlds, self._x, self._y]
+        return BatchRoombaWorld.ObservableState(
+            agent_locations=self.agent_locations,
+            is_dirty=is_dirty)
+
+    @property
+    def agent_locations(self):
+        return np.stack((self._x, self._y), axis=1)
+
+    def update(self, actions):
+        """
+        Apply one action to each world.
+
+        :param actions: length-N integer vector of codes into ACTIONS
+        """
+        actions = np.asarray(actions)
+        if actions.shape != self._worlds.shape:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(len(self._worlds),
+                                                       'actions',
+                                                       actions.shape))
+        if actions.size and (actions.min() < 0
+                             or actions.max() >= len(ACTIONS)):
+            bad = actions[(actions < 0) | (actions >= len(ACTIONS))][0]
+            raise ValueError(MSG_ILLEGAL_ACTION.format(bad))
+
+        sucking = self._worlds[actions == SUCK]
+        sucked_x = self._x[sucking]
+        sucked_y = self._y[sucking]
+        self._clean_count[sucking] += self._dirt[sucking, sucked_x, sucked_y]
+        self._dirt[sucking, sucked_x, sucked_y] = False
+
+        height, width = self._passable.shape[1:]
+        new_x = self._x + _DX[actions]
+        new_y = self._y + _DY[actions]
+        in_bounds = (new_x >= 0) & (new_x < height) \
+            & (new_y >= 0) & (new_y < width)
+        can_move = in_bounds & self._passable[self._worlds,
+                                              np.clip(new_x, 0, height - 1),
+                                              np.clip(new_y, 0, width - 1)]
+        self._x = np.where(can_move, new_x, self._x)
+        self._y = np.where(can_move, new_y, self._y)
+
+    def _initialize_agent_locations(self, agent_locations):
+        locations = np.array(agent_locations, dtype=np.int64).reshape(-1, 2)
+        x, y = locations[:, 0], locations[:, 1]
+        height, width = self._passable.shape[1:]
+        in_bounds = (x >= 0) & (x < height) & (y >= 0) & (y < width)
+        bad = np.flatnonzero(~in_bounds)
+        if bad.size:
+            raise ValueError(MSG_INVALID_PARAM.format("agent_locations",
+                                                      tuple(locations[bad[0]]),
+                                                      STR_OUT_OF_BOUNDS))
+        bad = np.flatnonzero(~self._passable[self._worlds, x, y])
+        if bad.size:
+            raise ValueError(MSG_INVALID_PARAM.format("agent_locations",
+                                                      tuple(locations[bad[0]]),
+                                                      STR_IMPASSABLE))
+        return x.copy(), y.copy()
+
+
+class BatchCleanFloorEvaluator(object):
+    """
+    Scores every world in a batch the way CleanFloorEvaluator scores a
+    single world: one point per clean location per time step.
+    """
+
+    def __init__(self):
+        self._score = 0
+
+    def update(self, state):
+        self._score = self._score + state.clean_count
+
+    @property
+    def score(self):
+        """
+        Vector with the score of each world.
+        """
+        return self._score
+
+
+class BatchRandomReflexAgent(object):
+    """
+    Batched RandomReflexAgent: sucks where there is dirt and moves in a
+    uniformly random direction everywhere else.
+    """
+
+    def __init__(self, seed=None):
+        """
+        :param seed: seed for this agent's NumPy random generator
+        """
+        self._rng = np.random.default_rng(seed)
+
+    def decide(self, percept):
+        moves = self._rng.integers(UP, RIGHT + 1, size=len(percept.is_dirty))
+        return np.where(percept.is_dirty, SUCK, moves)
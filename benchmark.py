@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from reflex_agent import ReflexAgent
+from roomba_world import (CleanFloorEvaluator, GridRoombaWorld,
+                          IncrementalCleanFloorEvaluator, RandomReflexAgent,
+                          RoombaWorld)
+from vacuum_world import (BasicVacuumWorld, NUM_STEPS,
+                          CleanFloorEvaluator as BasicCleanFloorEvaluator,
+                          _positive_int, run_experiment)
+
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'example')
+EXAMPLE_MAPS = ('donut_world', 'hourglass_world', 'linear_world')
+ENVIRONMENTS = (RoombaWorld, GridRoombaWorld)
+SCALES = (1, 4, 16)
+SCAN_BUDGET = 10 ** 6
+ROOMBA_ACTIONS = ('SUCK', 'UP', 'RIGHT', 'DOWN', 'LEFT')
+
+MSG_DESCRIPTION_PROGRAM = "Measure steps per second of the vacuum world " \
+                          "environments, agents and evaluators"
+MSG_DESCRIPTION_OUTPUT = "File to write the JSON results to " \
+                         "(default: standard output)"
+MSG_DESCRIPTION_REPEAT = "Time each benchmark this many times and keep " \
+                         "the fastest"
+MSG_DESCRIPTION_SCALES = "Tile each example map N times in each " \
+                         "direction (default: {})".format(
+                             ' '.join(str(s) for s in SCALES))
+MSG_DESCRIPTION_STEPS = "Steps per timed run (default: {})".format(NUM_STEPS)
+
+
+def run_benchmarks(scales=SCALES, steps=NUM_STEPS, repeat=3):
+    """
+    Time the experiment loop end to end and its components one by one.
+
+    :param scales: tiling factors applied to each example map
+    :param steps: number of steps (or calls) in each timed run
+    :param repeat: number of timed runs per benchmark; the fastest one
+      is reported
+    :return: list of result dictionaries, each with the keys
+      "benchmark", "environment", "map", "scale", "cells", "component",
+      "calls", "seconds" and "calls_per_second"
+    """
+    results = []
+    percept = {"agent_location": 'A', "is_dirty": False}
+    results.append(_result('ReflexAgent.decide', BasicVacuumWorld, None, 1,
+                           2, ReflexAgent, steps,
+                           _best_of(repeat, _time_calls, ReflexAgent().decide,
+                                    percept, steps)))
+    results.append(_result('run_experiment', BasicVacuumWorld, None, 1, 2,
+                           ReflexAgent, steps,
+                           _best_of(repeat, _time_experiment,
+                                    BasicVacuumWorld, {}, ReflexAgent,
+                                    BasicCleanFloorEvaluator, steps)))
+
+    with tempfile.TemporaryDirectory() as map_dir:
+        for map_name in EXAMPLE_MAPS:
+            for scale in scales:
+                path, start = _write_tiled_map(map_dir, map_name, scale)
+                environment_args = {
+                    'agent_location': [str(x) for x in start],
+                    'floor_state_path': [path]
+                }
+                results.extend(_benchmark_map(map_name, scale,
+                                              environment_args, steps,
+                                              repeat))
+    return results
+
+
+def main(argv=None):
+    args = _parse_arguments(argv)
+    random.seed(0)
+    report = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "steps": args.steps,
+        "results": run_benchmarks(args.scales, args.steps, args.repeat)
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+def _benchmark_map(map_name, scale, environment_args, steps, repeat):
+    results = []
+    for environment_class in ENVIRONMENTS:
+        environment = environment_class(**environment_args)
+        cells = len(environment.state.floor_status)
+
+        def result(benchmark, component, seconds, calls=steps):
+            return _result(benchmark, environment_class, map_name, scale,
+                           cells, component, calls, seconds)
+
+        results.append(result(
+            'run_experiment', RandomReflexAgent,
+            _best_of(repeat, _time_experiment, environment_class,
+                     environment_args, RandomReflexAgent,
+                     IncrementalCleanFloorEvaluator, steps)))
+        results.append(result(
+            'update', environment_class,
+            _best_of(repeat, _time_updates, environment_class,
+                     environment_args, steps)))
+        results.append(result(
+            'observable_state', environment_class,
+            _best_of(repeat, _time_property, environment,
+                     'observable_state', steps)))
+        # The full scan visits every cell, so it gets a fixed budget of
+        # cell visits rather than the full number of steps.
+        scans = max(1, min(steps, SCAN_BUDGET // cells))
+        evaluator_calls = ((CleanFloorEvaluator, scans),
+                           (IncrementalCleanFloorEvaluator, steps))
+        for evaluator_class, calls in evaluator_calls:
+            results.append(result(
+                'CleanFloorEvaluator.update', evaluator_class,
+                _best_of(repeat, _time_calls, evaluator_class().update,
+                         environment.state, calls),
+                calls))
+    return results
+
+
+def _result(benchmark, environment_class, map_name, scale, cells, component,
+            calls, seconds):
+    return {
+        "benchmark": benchmark,
+        "environment": environment_class.__name__,
+        "map": map_name,
+        "scale": scale,
+        "cells": cells,
+        "component": component.__name__,
+        "calls": calls,
+        "seconds": seconds,
+        "calls_per_second": calls / seconds if seconds else None
+    }
+
+
+def _best_of(repeat, timer, *args):
+    return min(timer(*args) for _ in range(repeat))
+
+
+def _time_experiment(environment_class, environment_args, agent_class,
+                     evaluator_class, steps):
+    environment = environment_class(**environment_args)
+    agent = agent_class()
+    evaluator = evaluator_class()
+    start = time.perf_counter()
+    run_experiment(environment, agent, evaluator, steps=steps,
+                   log_decisions=False)
+    return time.perf_counter() - start
+
+
+def _time_updates(environment_class, environment_args, steps):
+    environment = environment_class(**environment_args)
+    actions = [ROOMBA_ACTIONS[t % len(ROOMBA_ACTIONS)] for t in range(steps)]
+    update = environment.update
+    start = time.perf_counter()
+    for action in actions:
+        update(action)
+    return time.perf_counter() - start
+
+
+def _time_property(environment, name, steps):
+    # States are cached until they change, so the agent moves back and
+    # forth before every read, and the time the same moves take on their
+    # own is taken off.
+    moves = _round_trip(environment)
+    actions = [moves[t % 2] for t in range(steps)]
+    getter = getattr(type(environment), name).fget
+    update = environment.update
+    start = time.perf_counter()
+    for action in actions:
+        update(action)
+        getter(environment)
+    reads = time.perf_counter() - start
+    if steps % 2:
+        update(moves[1])
+    start = time.perf_counter()
+    for action in actions:
+        update(action)
+    seconds = reads - (time.perf_counter() - start)
+    if steps % 2:
+        update(moves[1])
+    return max(seconds, 0.0)
+
+
+def _round_trip(environment):
+    for moves in (('RIGHT', 'LEFT'), ('DOWN', 'UP'), ('LEFT', 'RIGHT'),
+                  ('UP', 'DOWN')):
+        location = environment.observable_state.agent_location
+        environment.update(moves[0])
+        if environment.observable_state.agent_location != location:
+            environment.update(moves[1])
+            return moves
+    return ('SUCK', 'SUCK')
+
+
+def _time_calls(function, argument, steps):
+    start = time.perf_counter()
+    for _ in range(steps):
+        function(argument)
+    return time.perf_counter() - start
+
+
+def _write_tiled_map(map_dir, map_name, scale):
+    with open(os.path.join(EXAMPLE_DIR, map_name)) as example:
+        rows = [line.rstrip() for line in example if line.strip()]
+    width = max(len(row) for row in rows)
+    rows = [row.ljust(width, '.') * scale for row in rows] * scale
+    path = os.path.join(map_dir, '{}_x{}'.format(map_name, scale))
+    with open(path, 'w') as tiled:
+        tiled.writelines(row + '\n' for row in rows)
+    start = next((x, y) for x, row in enumerate(rows)
+                 for y, char in enumerate(row) if char != 'x')
+    return path, start
+
+
+def _parse_arguments(argv):
+    arg_parser = argparse.ArgumentParser(description=MSG_DESCRIPTION_PROGRAM)
+    arg_parser.add_argument('--scales', type=_positive_int, nargs='+',
+                            default=list(SCALES), metavar='N',
+                            help=MSG_DESCRIPTION_SCALES)
+    arg_parser.add_argument('--steps', type=_positive_int, default=NUM_STEPS,
+                            metavar='N', help=MSG_DESCRIPTION_STEPS)
+    arg_parser.add_argument('--repeat', type=_positive_int, default=3,
+                            metavar='N', help=MSG_DESCRIPTION_REPEAT)
+    arg_parser.add_argument('--output', type=str, default=None,
+                            metavar='PATH', help=MSG_DESCRIPTION_OUTPUT)
+    return arg_parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    main()
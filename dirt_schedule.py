@@ -0,0 +1,97 @@
+import heapq
+import math
+import random
+
+
+MSG_INVALID_RATE = "Invalid dirt rate: '{}' (expected a probability " \
+                   "between 0 and 1)"
+
+
+class DirtSchedule(object):
+    """
+    When each clean location will next get dirty again.
+
+    On every step, each clean location gets dirty with its own
+    probability, its rate. Rather than drawing for every location on
+    every step, the schedule draws a location's waiting time from the
+    geometric distribution once, when it becomes clean, and keeps the
+    resulting times in a heap. A step then costs O(log n) for each
+    location that gets dirty and nothing for the others, however large
+    the floor.
+
+    Locations are identified by whatever keys the environment uses for
+    them; keys only need to be hashable and comparable with each other.
+    """
+
+    def __init__(self, rates, rng=random):
+        """
+        :param rates: function from a location key to its rate
+        :param rng: source of randomness with a random() method; the
+          random module by default, so seeding it (as run_trials does
+          for each trial) makes runs repeatable
+        """
+        self._rates = rates
+        self._rng = rng
+        self._time = 0
+        self._events = []
+
+    def __len__(self):
+        """
+        Number of clean locations waiting to get dirty.
+        """
+        return len(self._events)
+
+    def start(self, keys):
+        """
+        Schedule the locations that are clean to begin with.
+
+        :param keys: iterable of location keys
+        """
+        events = self._events
+        for key in keys:
+            rate = self._rates(key)
+            if rate > 0:
+                events.append((self._time + self._wait(rate), key))
+        heapq.heapify(events)
+
+    def clean(self, key):
+        """
+        Schedule a location that has just been cleaned.
+        """
+        rate = self._rates(key)
+        if rate > 0:
+            heapq.heappush(self._events, (self._time + self._wait(rate), key))
+
+    def advance(self):
+        """
+        Move on to the next step.
+
+        :return: list of the keys of the locations that get dirty on it
+        """
+        self._time += 1
+        events = self._events
+        due = []
+        while events and events[0][0] <= self._time:
+            due.append(heapq.heappop(events)[1])
+        return due
+
+    def _wait(self, rate):
+        if rate >= 1:
+            return 1
+        # Inverse transform sampling; 1 - random() is never 0.
+        return int(math.log(1.0 - self._rng.random()) /
+                   math.log1p(-rate)) + 1
+
+
+def parse_rate(string):
+    """
+    :param string: a probability, such as a command line argument
+    :return: the probability as a float
+    """
+    try:
+        rate = float(string)
+    except ValueError:
+        raise ValueError(MSG_INVALID_RATE.format(string))
+    if not 0 <= rate <= 1:
+        raise ValueError(MSG_INVALID_RATE.format(string))
+    return rate
@@ -0,0 +1,221 @@
+from collections import namedtuple
+
+from dirt_schedule import DirtSchedule, parse_rate
+from roomba_world import (CELL_CLEAN, CELL_DIRTY, MAP_CACHE, MOVES,
+                          MSG_ILLEGAL_ACTION, MSG_INVALID_PARAM,
+                          MSG_WRONG_ARGV_LEN, RoombaWorld, STR_IMPASSABLE,
+                          STR_OUT_OF_BOUNDS, _find_cells)
+from vacuum_world import ExperimentError, NUM_STEPS
+
+
+STR_OCCUPIED = "occupied by another agent"
+STR_EVEN_NUMBER = "an even number of"
+
+ACTIONS = frozenset(('SUCK',) + MOVES)
+
+
+def run_fleet_experiment(environment, agents, evaluator, steps=NUM_STEPS,
+                         early_termination=False):
+    """
+    Simulate a fleet of agents sharing one environment.
+
+    On each tick every agent decides on its own percept, and the
+    environment then carries out all of the decisions together. Errors
+    are reported as ExperimentErrors, as by vacuum_world.run_experiment.
+
+    :param environment: FleetRoombaWorld to act in
+    :param agents: one agent per robot in the environment, in the same
+      order as its agent locations
+    :param evaluator: object that scores the fleet against the
+      performance measure, such as an IncrementalCleanFloorEvaluator
+    :param steps: number of ticks to simulate
+    :param early_termination: whether to stop once the environment is
+      quiescent, crediting the evaluator with the remaining ticks
+    """
+    agents = list(agents)
+    if len(agents) != len(environment.observable_states):
+        raise ValueError(MSG_WRONG_ARGV_LEN.format(
+            len(environment.observable_states), 'agents', len(agents)))
+    for t in range(1, steps + 1):
+        percepts = environment.observable_states
+        try:
+            decisions = [agent.decide(percept)
+                         for agent, percept in zip(agents, percepts)]
+        # As in run_experiment, ValueError means an agent rejected the
+        # environment's percept.
+        except ValueError as e:
+            raise ExperimentError('environment', e)
+        except Exception as e:
+            raise ExperimentError('agent', e)
+        try:
+            environment.update(decisions)
+        except ValueError as e:
+            raise ExperimentError('agent', e)
+        except Exception as e:
+            raise ExperimentError('environment', e)
+        if early_termination:
+            score = evaluator.score
+        evaluator.update(environment.state)
+        if early_termination and environment.is_quiescent:
+            evaluator.credit((evaluator.score - score) * (steps - t))
+            break
+
+
+class FleetRoombaWorld(object):
+    """
+    RoombaWorld floor shared by a fleet of robots, each with its own
+    agent.
+
+    No two robots are ever in the same location. Robots act one after
+    another in order, so a robot can move into a location another
+    robot has just left, and when two robots try to enter the same
+    location, the lower-numbered one gets there and the other stays
+    put. A robot that moves into an occupied location, or into an
+    obstacle or off the floor, stays put.
+
+    Robots are tracked by cell index in a map of occupied cells, and
+    each robot's percept is kept until its location changes or gets
+    cleaned or dirty, so a tick costs time in proportion to the number
+    of robots, whatever the size of the floor.
+    """
+
+    State = namedtuple('State', ['floor_status', 'agent_locations',
+                                 'clean_count'])
+
+    def __init__(self, agent_locations, floor_state_path, dirt_rate=None):
+        """
+        Initialize a new environment.
+
+        :param agent_locations: list of strings with the starting x and
+          y of each robot in turn, such as ['0', '0', '2', '3'] for two
+          robots
+        :param floor_state_path: one-element list with the path of the
+          floor state file
+        :param dirt_rate: optional one-element list with the probability
+          per tick that a clean location gets dirty again, as for
+          RoombaWorld
+        """
+        if len(floor_state_path) != 1:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(1,
+                                                       'floor_state_path',
+                                                       repr(floor_state_path)))
+        if not agent_locations or len(agent_locations) % 2:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(
+                STR_EVEN_NUMBER, 'agent_locations', repr(agent_locations)))
+        self._grid = MAP_CACHE.load(floor_state_path[0])
+        self._neighbors = MAP_CACHE.neighbors(floor_state_path[0])
+        self._indexes = []
+        self._occupied = {}
+        for i in range(0, len(agent_locations), 2):
+            index = self._initialize_agent_index(agent_locations[i:i + 2])
+            self._occupied[index] = len(self._indexes)
+            self._indexes.append(index)
+        self._locations = [self._neighbors.point(index)
+                           for index in self._indexes]
+        self._percepts = [self._percept(index) for index in self._indexes]
+        self._clean_count = self._grid.count_clean()
+        self._schedule = self._schedule_dirt(dirt_rate)
+        self._state = None
+
+    @property
+    def state(self):
+        state = self._state
+        if state is None:
+            state = self._state = FleetRoombaWorld.State(
+                floor_status=self._grid,
+                agent_locations=tuple(self._locations),
+                clean_count=self._clean_count)
+        return state
+
+    @property
+    def observable_states(self):
+        """
+        List with each robot's RoombaWorld.ObservableState, in order.
+        The list is the environment's own and must not be changed.
+        """
+        return self._percepts
+
+    @property
+    def is_quiescent(self):
+        return self._clean_count == len(self._grid) and not self._schedule
+
+    def update(self, actions):
+        """
+        :param actions: list with one action per robot, in order
+        """
+        if len(actions) != len(self._indexes):
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(
+                len(self._indexes), 'actions', repr(actions)))
+        # Every action is checked first, so that a bad one leaves the
+        # world as it was.
+        for action in actions:
+            if action not in ACTIONS:
+                raise ValueError(MSG_ILLEGAL_ACTION.format(action))
+        grid = self._grid
+        neighbors = self._neighbors
+        indexes = self._indexes
+        occupied = self._occupied
+        changed = False
+        for agent, action in enumerate(actions):
+            index = indexes[agent]
+            if action == 'SUCK':
+                if grid.cells[index] == CELL_DIRTY:
+                    grid.set_cell(index, CELL_CLEAN)
+                    self._clean_count += 1
+                    self._percepts[agent] = self._percept(index)
+                    if self._schedule is not None:
+                        self._schedule.clean(index)
+                    changed = True
+                continue
+            target = neighbors.target(index, action)
+            if target != index and target not in occupied:
+                del occupied[index]
+                occupied[target] = agent
+                indexes[agent] = target
+                self._locations[agent] = neighbors.point(target)
+                self._percepts[agent] = self._percept(target)
+                changed = True
+        if self._schedule is not None:
+            due = self._schedule.advance()
+            for index in due:
+                grid.set_cell(index, CELL_DIRTY)
+                agent = occupied.get(index)
+                if agent is not None:
+                    self._percepts[agent] = self._percept(index)
+            if due:
+                self._clean_count -= len(due)
+                changed = True
+        if changed:
+            self._state = None
+
+    def _initialize_agent_index(self, agent_location):
+        location = RoombaWorld.Point(*(int(x) for x in agent_location))
+        index = self._grid.index(*location)
+        if index is None:
+            failure_reason = STR_OUT_OF_BOUNDS
+        elif self._grid.cells[index] not in (CELL_CLEAN, CELL_DIRTY):
+            failure_reason = STR_IMPASSABLE
+        elif index in self._occupied:
+            failure_reason = STR_OCCUPIED
+        else:
+            return index
+        raise ValueError(MSG_INVALID_PARAM.format("agent_locations",
+                                                  location, failure_reason))
+
+    def _percept(self, index):
+        return RoombaWorld.ObservableState(
+            agent_location=self._neighbors.point(index),
+            is_dirty=self._grid.cells[index] == CELL_DIRTY)
+
+    def _schedule_dirt(self, dirt_rate):
+        if dirt_rate is None:
+            return None
+        if len(dirt_rate) != 1:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(1, 'dirt_rate',
+                                                       repr(dirt_rate)))
+        rate = parse_rate(dirt_rate[0])
+        if rate == 0:
+            return None
+        schedule = DirtSchedule(lambda index: rate)
+        schedule.start(_find_cells(self._grid.cells, CELL_CLEAN))
+        return schedule
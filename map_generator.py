@@ -0,0 +1,154 @@
+import argparse
+import random
+
+from vacuum_world import _positive_int
+
+
+PATTERNS = ('open', 'donut', 'hourglass')
+# Densities are applied by comparing one random byte per cell against a
+# threshold, so they are rounded to multiples of 1/256.
+DENSITY_STEPS = 256
+
+MSG_INVALID_DENSITY = "{} must be between 0 and 1, got {}"
+MSG_INVALID_PATTERN = "Unknown pattern '{}', expected one of: {}"
+MSG_INVALID_SIZE = "{} must be a positive integer, got {}"
+MSG_GENERATED = "Wrote a {} x {} floor to {}; first passable location: {}"
+MSG_NO_PASSABLE = "Wrote a {} x {} floor to {}; it has no passable location"
+MSG_DESCRIPTION_PROGRAM = "Generate a floor state file for RoombaWorld"
+MSG_DESCRIPTION_PATH = "File to write the floor state to"
+MSG_DESCRIPTION_HEIGHT = "Number of rows"
+MSG_DESCRIPTION_WIDTH = "Number of locations in each row"
+MSG_DESCRIPTION_DIRT = "Fraction of passable locations that start out " \
+                       "dirty (default: 0.5)"
+MSG_DESCRIPTION_OBSTACLES = "Fraction of locations that are obstacles, " \
+                            "before the pattern is drawn (default: 0)"
+MSG_DESCRIPTION_PATTERN = "Obstacles to draw over the random floor: a " \
+                          "diamond in the middle (donut) or triangles on " \
+                          "the top and bottom edges (hourglass) " \
+                          "(default: open)"
+MSG_DESCRIPTION_SEED = "Seed for the random layout (default: random)"
+
+
+def generate_map(path, height, width, dirt_density=0.5,
+                 obstacle_density=0.0, pattern='open', seed=None):
+    """
+    Write a floor state file in the format RoombaWorld reads, one row
+    at a time, so only a single row is ever held in memory.
+
+    Each location is independently an obstacle with probability
+    obstacle_density, and otherwise dirty with probability
+    dirt_density. The pattern's obstacles are then drawn over the
+    random floor; scaled to 7 x 9 and 7 x 7 with every location dirty,
+    donut and hourglass reproduce the example maps of the same names.
+
+    :param path: file to write
+    :param height: number of rows
+    :param width: number of locations in each row
+    :param dirt_density: fraction of passable locations that are dirty
+    :param obstacle_density: fraction of locations that are obstacles
+    :param pattern: one of PATTERNS
+    :param seed: seed for the layout; the same arguments and seed always
+      write the same file
+    :return: (x, y) of the first passable location, a valid starting
+      location for an agent, or None if there is none
+    """
+    for name, value in (('height', height), ('width', width)):
+        if not isinstance(value, int) or value < 1:
+            raise ValueError(MSG_INVALID_SIZE.format(name, value))
+    for name, value in (('dirt_density', dirt_density),
+                        ('obstacle_density', obstacle_density)):
+        if not 0 <= value <= 1:
+            raise ValueError(MSG_INVALID_DENSITY.format(name, value))
+    if pattern not in PATTERNS:
+        raise ValueError(MSG_INVALID_PATTERN.format(pattern,
+                                                    ', '.join(PATTERNS)))
+
+    cells = _cell_table(dirt_density, obstacle_density)
+    rng = random.Random(seed)
+    start = None
+    with open(path, 'wb') as floor:
+        for x in range(height):
+            row = bytearray(rng.randbytes(width).translate(cells))
+            span = _obstacle_span(pattern, x, height, width)
+            if span is not None:
+                first, last = span
+                row[first:last + 1] = b'x' * (last + 1 - first)
+            if start is None:
+                y = _first_passable(row)
+                if y is not None:
+                    start = (x, y)
+            row.append(ord('\n'))
+            floor.write(row)
+    return start
+
+
+def _cell_table(dirt_density, obstacle_density):
+    obstacles = round(obstacle_density * DENSITY_STEPS)
+    dirty = obstacles + round((DENSITY_STEPS - obstacles) * dirt_density)
+    return b'x' * obstacles + b'+' * (dirty - obstacles) + \
+        b'.' * (DENSITY_STEPS - dirty)
+
+
+def _obstacle_span(pattern, x, height, width):
+    # Every pattern covers one run of each row, from first to last
+    # inclusive.
+    if pattern == 'donut':
+        half = min(height, width) // 6 - abs(x - height // 2)
+    elif pattern == 'hourglass':
+        edge = min(x, height - 1 - x)
+        half = width // 2 - 1 - edge * width // height
+    else:
+        return None
+    if half < 0:
+        return None
+    return width // 2 - half, width // 2 + half
+
+
+def _first_passable(row):
+    clean = row.find(b'.')
+    dirty = row.find(b'+')
+    if clean < 0:
+        return None if dirty < 0 else dirty
+    return clean if dirty < 0 else min(clean, dirty)
+
+
+def main(argv=None):
+    args = _parse_arguments(argv)
+    start = generate_map(args.path, args.height, args.width, args.dirt,
+                         args.obstacles, args.pattern, args.seed)
+    if start is None:
+        print(MSG_NO_PASSABLE.format(args.height, args.width, args.path))
+    else:
+        print(MSG_GENERATED.format(args.height, args.width, args.path,
+                                   ' '.join(str(x) for x in start)))
+
+
+def _density(string):
+    value = float(string)
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(string)
+    return value
+
+
+def _parse_arguments(argv):
+    arg_parser = argparse.ArgumentParser(description=MSG_DESCRIPTION_PROGRAM)
+    arg_parser.add_argument('path', type=str, metavar='PATH',
+                            help=MSG_DESCRIPTION_PATH)
+    arg_parser.add_argument('--height', type=_positive_int, required=True,
+                            metavar='N', help=MSG_DESCRIPTION_HEIGHT)
+    arg_parser.add_argument('--width', type=_positive_int, required=True,
+                            metavar='N', help=MSG_DESCRIPTION_WIDTH)
+    arg_parser.add_argument('--dirt', type=_density, default=0.5,
+                            metavar='FRACTION', help=MSG_DESCRIPTION_DIRT)
+    arg_parser.add_argument('--obstacles', type=_density, default=0.0,
+                            metavar='FRACTION',
+                            help=MSG_DESCRIPTION_OBSTACLES)
+    arg_parser.add_argument('--pattern', type=str, default='open',
+                            choices=PATTERNS, help=MSG_DESCRIPTION_PATTERN)
+    arg_parser.add_argument('--seed', type=int, default=None, metavar='N',
+                            help=MSG_DESCRIPTION_SEED)
+    return arg_parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+
+MEMO_SIZE = 4096
+
+MSG_NOT_DETERMINISTIC = "{} does not declare itself deterministic"
+
+
+class MemoizingAgent(object):
+    """
+    Wraps a deterministic agent and remembers its decision for each
+    percept it has seen, so repeated percepts skip the agent's
+    validation and logic entirely.
+
+    Agents opt in with a class attribute deterministic = True, promising
+    that decide() is a pure function of the percept. Percepts are looked
+    up by equality: namedtuples such as RoombaWorld.ObservableState are
+    used as they are, and dictionaries by their items. Percepts that are
+    equal but of different types (True and 1, say) share a decision.
+
+    The wrapper is deterministic too, so runs of a memoized agent can
+    still be fast-forwarded.
+    """
+
+    deterministic = True
+
+    def __init__(self, agent, size=MEMO_SIZE):
+        """
+        :param agent: deterministic agent to wrap
+        :param size: most decisions to remember; the least recently
+          used one is forgotten first
+        """
+        if getattr(type(agent), 'deterministic', False) is not True:
+            raise ValueError(MSG_NOT_DETERMINISTIC.format(
+                type(agent).__name__))
+        self._decide = agent.decide
+        self._size = size
+        self._decisions = OrderedDict()
+
+    def decide(self, percept):
+        if isinstance(percept, dict):
+            key = tuple(percept.items())
+        else:
+            key = percept
+        decisions = self._decisions
+        decision = decisions.get(key)
+        if decision is None:
+            decision = decisions[key] = self._decide(percept)
+            if len(decisions) > self._size:
+                decisions.popitem(last=False)
+        else:
+            decisions.move_to_end(key)
+        return decision
@@ -0,0 +1,129 @@
+import os
+from collections import OrderedDict, deque
+
+from roomba_world import (CELL_CLEAN, CELL_DIRTY, MAP_CACHE, MOVES,
+                          MSG_WRONG_ARGV_LEN)
+
+
+ACTIONS = ('SUCK',) + MOVES
+SUCK = 0
+PLAN_CACHE_SIZE = 128
+
+_DIRT = bytes(int(cell == CELL_DIRTY) for cell in range(256))
+
+_plans = OrderedDict()
+
+
+class CoveragePlannerAgent(object):
+    """
+    Agent for RoombaWorld that plans a tour of every reachable dirty
+    location on its first decision and then follows it, one action per
+    step. Once the tour is done, it stays put.
+
+    The tour is greedy: from wherever the agent is, it goes by a
+    shortest path to the nearest dirty location and cleans it. Tours
+    are cached by map and starting location, so agents in later trials
+    on the same map do no planning at all.
+    """
+
+    def __init__(self, floor_state_path):
+        """
+        :param floor_state_path: list holding the path of the floor
+          state file the environment was loaded from
+        """
+        if len(floor_state_path) != 1:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(1,
+                                                       'floor_state_path',
+                                                       repr(floor_state_path)))
+        self._floor_state_path = floor_state_path[0]
+        self._plan = None
+        self._t = 0
+
+    def decide(self, percept):
+        if self._plan is None:
+            self._plan = plan_coverage(self._floor_state_path,
+                                       tuple(percept.agent_location))
+        t = self._t
+        if t < len(self._plan):
+            self._t = t + 1
+            return ACTIONS[self._plan[t]]
+        return 'SUCK'
+
+
+def plan_coverage(floor_state_path, start):
+    """
+    The greedy cleaning tour of a floor map, from the cache if it has
+    been planned before.
+
+    :param floor_state_path: path of the floor state file
+    :param start: the agent's starting (x, y) location
+    :return: bytes of action codes, each an index into ACTIONS
+    """
+    floor_map = MAP_CACHE.floor_map(floor_state_path)
+    key = (os.path.realpath(floor_state_path), floor_map.stamp, start)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = _plan_tour(floor_map.cells, floor_map.width,
+                          MAP_CACHE.neighbors(floor_state_path), start)
+        _plans[key] = plan
+        if len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    else:
+        _plans.move_to_end(key)
+    return plan
+
+
+def _plan_tour(cells, width, neighbors, start):
+    x, y = start
+    if width == 0 or not (0 <= x < len(cells) // width and 0 <= y < width):
+        return b''
+    position = x * width + y
+    if cells[position] not in (CELL_CLEAN, CELL_DIRTY):
+        return b''
+
+    dirty = bytearray(bytes(cells).translate(_DIRT))
+    remaining = dirty.count(1)
+    plan = bytearray()
+    while remaining:
+        path = _path_to_nearest(neighbors, dirty, position)
+        if path is None:
+            break
+        for action, position in path:
+            plan.append(action)
+        plan.append(SUCK)
+        dirty[position] = 0
+        remaining -= 1
+    return bytes(plan)
+
+
+def _path_to_nearest(neighbors, dirty, source):
+    """
+    Breadth-first search from source to the nearest dirty cell.
+
+    :return: list of (action code, cell index) moves, or None if no
+      dirty cell is reachable
+    """
+    if dirty[source]:
+        return []
+    parents = {source: None}
+    frontier = deque((source,))
+    while frontier:
+        index = frontier.popleft()
+        for action, target in enumerate(neighbors.targets(index), start=1):
+            if target in parents:
+                continue
+            parents[target] = (action, index)
+            if dirty[target]:
+                return _unwind(parents, target)
+            frontier.append(target)
+    return None
+
+
+def _unwind(parents, target):
+    path = []
+    while parents[target] is not None:
+        action, previous = parents[target]
+        path.append((action, target))
+        target = previous
+    path.reverse()
+    return path
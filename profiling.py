@@ -0,0 +1,243 @@
+import math
+import time
+from collections import Counter
+
+
+PERCENTILES = (50, 90, 99)
+BUCKETS_PER_DOUBLING = 8
+
+MSG_PROFILE_HEADER = "{:<18}{:<32}{:>10}{:>12}{:>8}{:>12}{:>12}{:>12}".format(
+    "Phase", "Component", "Calls", "Total (s)", "Share",
+    *("p{} (us)".format(p) for p in PERCENTILES))
+MSG_PROFILE_ROW = "{:<18}{:<32}{:>10}{:>12.4f}{:>8.1%}{:>12.2f}{:>12.2f}" \
+                  "{:>12.2f}"
+
+
+class PhaseProfiler(object):
+    """
+    Collects the latency of each phase of the experiment loop, per
+    phase and component class.
+
+    Latencies are kept in logarithmic histograms, so memory does not
+    grow with the number of steps; percentiles are accurate to within
+    one bucket (about 9%).
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def instrument(self, environment, agent, evaluator):
+        """
+        Wrap the participants of an experiment so that each call the
+        experiment loop makes is timed.
+
+        The wrappers offer the same optional members as the objects
+        they wrap, such as step() and state_key, so the experiment loop
+        takes the same path with the profiler as without it.
+
+        :return: (environment, agent, evaluator) tuple of wrappers
+        """
+        return (_timed(_TimedEnvironment, environment, self),
+                _timed(_TimedAgent, agent, self),
+                _timed(_TimedEvaluator, evaluator, self))
+
+    def record(self, phase, component, seconds):
+        """
+        Add one measurement.
+
+        :param phase: name of the phase, e.g. "decide"
+        :param component: class of the object that did the work
+        :param seconds: how long it took
+        """
+        key = (phase, component.__name__)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _LatencyStats()
+        stats.add(seconds)
+
+    def summary(self):
+        """
+        One dictionary per (phase, component) with the keys "phase",
+        "component", "calls", "total", "share" (of the total time of
+        all phases) and "percentiles", which maps each of PERCENTILES to
+        a latency in seconds.
+        """
+        grand_total = sum(stats.total for stats in self._stats.values())
+        return [{
+            "phase": phase,
+            "component": component,
+            "calls": stats.count,
+            "total": stats.total,
+            "share": stats.total / grand_total if grand_total else 0.0,
+            "percentiles": {p: stats.percentile(p) for p in PERCENTILES}
+        } for (phase, component), stats in self._stats.items()]
+
+    def report(self):
+        """
+        The summary as lines of a human-readable table.
+        """
+        lines = [MSG_PROFILE_HEADER]
+        for row in self.summary():
+            lines.append(MSG_PROFILE_ROW.format(
+                row["phase"], row["component"], row["calls"], row["total"],
+                row["share"],
+                *(row["percentiles"][p] * 1e6 for p in PERCENTILES)))
+        return lines
+
+
+class _LatencyStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._buckets = Counter()
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        nanoseconds = seconds * 1e9
+        if nanoseconds > 1:
+            bucket = int(math.log2(nanoseconds) * BUCKETS_PER_DOUBLING)
+        else:
+            bucket = 0
+        self._buckets[bucket] += 1
+
+    def percentile(self, percentile):
+        rank = percentile / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) / 1e9
+        return 0.0
+
+
+def _component_class(component):
+    # Wrappers that expose the object they wrap as a "wrapped" property,
+    # such as RecordingEnvironment, are reported as the wrapped class.
+    while isinstance(getattr(type(component), 'wrapped', None), property):
+        component = component.wrapped
+    return type(component)
+
+
+def _timed(wrapper_class, component, profiler):
+    # run_experiment looks the optional members up on the classes, so
+    # each wrapper gets a class of its own with just those its
+    # component's class has. Members given as None are copied as they
+    # are.
+    members = {}
+    for name, member in wrapper_class.optional_members.items():
+        value = getattr(type(component), name, None)
+        if value is not None:
+            members[name] = value if member is None else member
+    if members:
+        wrapper_class = type(wrapper_class.__name__, (wrapper_class,),
+                             members)
+    return wrapper_class(component, profiler)
+
+
+class _Timed(object):
+
+    optional_members = {}
+
+    def __init__(self, component, profiler):
+        self._component = component
+        self._class = _component_class(component)
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._component, name)
+
+
+class _TimedEnvironment(_Timed):
+
+    @property
+    def observable_state(self):
+        start = time.perf_counter()
+        observable_state = self._component.observable_state
+        self._profiler.record('observable_state', self._class,
+                              time.perf_counter() - start)
+        return observable_state
+
+    @property
+    def state(self):
+        start = time.perf_counter()
+        state = self._component.state
+        self._profiler.record('state', self._class,
+                              time.perf_counter() - start)
+        return state
+
+    def update(self, action):
+        start = time.perf_counter()
+        try:
+            self._component.update(action)
+        finally:
+            self._profiler.record('update', self._class,
+                                  time.perf_counter() - start)
+
+    def _step(self, action):
+        start = time.perf_counter()
+        try:
+            return self._component.step(action)
+        finally:
+            self._profiler.record('step', self._class,
+                                  time.perf_counter() - start)
+
+    def _state_key(self):
+        start = time.perf_counter()
+        state_key = self._component.state_key
+        self._profiler.record('state_key', self._class,
+                              time.perf_counter() - start)
+        return state_key
+
+    optional_members = {
+        'step': _step,
+        'state_key': property(_state_key)
+    }
+
+
+class _TimedAgent(_Timed):
+
+    optional_members = {
+        'deterministic': None
+    }
+
+    def decide(self, percept):
+        start = time.perf_counter()
+        try:
+            return self._component.decide(percept)
+        finally:
+            self._profiler.record('decide', self._class,
+                                  time.perf_counter() - start)
+
+
+class _TimedEvaluator(_Timed):
+
+    def update(self, state):
+        start = time.perf_counter()
+        try:
+            self._component.update(state)
+        finally:
+            self._profiler.record('evaluate', self._class,
+                                  time.perf_counter() - start)
+
+    def _start(self, state):
+        start = time.perf_counter()
+        try:
+            self._component.start(state)
+        finally:
+            self._profiler.record('start', self._class,
+                                  time.perf_counter() - start)
+
+    def _update_step(self, step):
+        start = time.perf_counter()
+        try:
+            self._component.update_step(step)
+        finally:
+            self._profiler.record('evaluate', self._class,
+                                  time.perf_counter() - start)
+
+    optional_members = {
+        'start': _start,
+        'update_step': _update_step
+    }
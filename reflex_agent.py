@@ -1,4 +1,6 @@
 class ReflexAgent(object):
+    deterministic = True
+
     def decide(self, percept):
         if "is_dirty" not in percept.keys():
             raise ValueError("Missing dirt status")
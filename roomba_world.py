@@ -1,26 +1,62 @@
+import atexit
+import mmap
+import os
 import random
-from collections import namedtuple
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+from dirt_schedule import DirtSchedule, parse_rate
 
 
 MSG_WRONG_ARGV_LEN = "expected {} value(s) for {}, got '{}'"
 MSG_ILLEGAL_FLOOR_STATE_CHR = "Unexpected character in floor state file: '{}'"
 MSG_ILLEGAL_ACTION = "Unrecognized action: {}"
 MSG_INVALID_PARAM = "Invalid parameter for '{}': '{}' ({})"
+MSG_ILLEGAL_RATE_WEIGHT_CHR = "Unexpected character in dirt rate file: '{}'"
+MSG_RATE_PATH_WITHOUT_RATE = "dirt_rate_path needs a dirt_rate to scale"
 REPR_LOCATION = "{}, {} location"
 STR_CLEAN = "clean"
 STR_DIRTY = "dirty"
 STR_EXPECTED_BOOLEAN = "expected a boolean"
+STR_EXPECTED_INTEGER = "expected an integer"
+STR_EXPECTED_POSITIVE = "expected a positive integer"
 STR_IMPASSABLE = "impassable"
 STR_OUT_OF_BOUNDS = "out of bounds"
 STR_PASSABLE = "passable"
 
+CELL_CLEAN = 0
+CELL_DIRTY = 1
+CELL_OBSTACLE = 2
+CELL_VOID = 3
+
+_CELL_CODES = bytes.maketrans(b'.+x ', bytes((CELL_CLEAN,
+                                              CELL_DIRTY,
+                                              CELL_OBSTACLE,
+                                              CELL_VOID)))
+_FLOOR_CHARS = str.maketrans('', '', '.+x')
+
+MOVES = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+MOVE_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DISTANCE_CACHE_SIZE = 16
+MAP_CACHE_SIZE = 64
+PARSE_CHUNK_SIZE = 1 << 20
+_MOVE_SLOTS = {action: slot for slot, action in enumerate(MOVES)}
+# Maps each random byte to a move slot; 256 is a multiple of len(MOVES),
+# so every move is equally likely.
+_MOVE_CODES = bytes(code % len(MOVES) for code in range(256))
+
 
 class RoombaWorld(object):
 
-    State = namedtuple('State', ['floor_status', 'agent_location'])
+    State = namedtuple('State', ['floor_status', 'agent_location',
+                                 'clean_count'], defaults=(None,))
     ObservableState = namedtuple('ObservableState', ['agent_location',
                                                      'is_dirty'])
     Point = namedtuple('Point', ['x', 'y'])
+    Step = namedtuple('Step', ['percept', 'cleaned', 'moved'])
 
     @staticmethod
     def _read_floor_status(floor_state_file):
@@ -34,7 +70,7 @@ class RoombaWorld(object):
                 elif char == '+':
                     location = Location(is_dirty=True)
                 elif char == 'x':
-                    location = Obstacle()
+                    location = OBSTACLE
                 else:
                     raise ValueError(MSG_ILLEGAL_FLOOR_STATE_CHR.format(char))
                 floor_status[(x, y)] = location
@@ -43,7 +79,27 @@ class RoombaWorld(object):
             y = 0
         return floor_status
 
-    def __init__(self, agent_location, floor_state_path):
+    def __init__(self, agent_location, floor_state_path, dirt_rate=None,
+                 dirt_rate_path=None):
+        """
+        Initialize a new environment.
+
+        Dirt only ever gets cleaned unless a dirt rate is given. Then
+        on every step each clean location gets dirty again with that
+        probability, scaled by the location's weight when there is a
+        dirt rate file.
+
+        :param agent_location: two-element list with the agent's
+          starting x and y
+        :param floor_state_path: one-element list with the path of the
+          floor state file
+        :param dirt_rate: optional one-element list with the probability
+          per step that a clean location gets dirty
+        :param dirt_rate_path: optional one-element list with the path
+          of a file laid out like the floor state file, with a digit
+          from 0 to 9 for each location; each location's rate is
+          dirt_rate times its digit divided by 9
+        """
         if len(floor_state_path) != 1:
             raise ValueError(MSG_WRONG_ARGV_LEN.format(1,
                                                        'floor_state_path',
@@ -51,47 +107,159 @@ class RoombaWorld(object):
 
         self._floor_status = self._initialize_floor_state(floor_state_path)
         self._agent_location = self._initialize_agent_location(agent_location)
+        self._clean_count = self._count_clean_locations()
+        self._moves = self._move_table(floor_state_path)
+        self._dirt = None
+        self._schedule = self._schedule_dirt(dirt_rate, dirt_rate_path)
+        # State and ObservableState are immutable, so each one is built
+        # once and handed out until a SUCK or a move changes it.
+        self._state = None
+        self._observable_state = None
 
     @property
     def state(self):
-        return RoombaWorld.State(floor_status=self._floor_status,
-                                 agent_location=tuple(self._agent_location))
+        state = self._state
+        if state is None:
+            state = self._state = RoombaWorld.State(
+                floor_status=self._floor_status,
+                agent_location=self._agent_location,
+                clean_count=self._clean_count)
+        return state
 
     @property
     def observable_state(self):
-        agent_location = tuple(self._agent_location)
-        is_dirty = self._floor_status[self._agent_location].is_dirty
-        return RoombaWorld.ObservableState(agent_location=agent_location,
-                                           is_dirty=is_dirty)
+        observable_state = self._observable_state
+        if observable_state is None:
+            is_dirty = self._floor_status[self._agent_location].is_dirty
+            observable_state = self._observable_state = \
+                RoombaWorld.ObservableState(
+                    agent_location=self._agent_location, is_dirty=is_dirty)
+        return observable_state
+
+    @property
+    def is_quiescent(self):
+        return self._clean_count == len(self._floor_status) \
+            and not self._schedule
+
+    @property
+    def dirt_schedule(self):
+        """
+        The DirtSchedule of the dirt that comes back, or None if
+        cleaned locations stay clean.
+        """
+        return self._schedule
+
+    @property
+    def dirt(self):
+        """
+        The DirtIndex of this world's floor. It is built on first use
+        and kept up to date from then on.
+        """
+        if self._dirt is None:
+            self._dirt = self._index_dirt()
+        return self._dirt
+
+    def step(self, action):
+        """
+        Perform an action and report its effect in one call.
+
+        :return: Step with the next ObservableState as percept, the
+          number of locations cleaned (less any that got dirty again)
+          and whether the agent moved
+        """
+        clean_count = self._clean_count
+        agent_location = self._agent_location
+        self.update(action)
+        return RoombaWorld.Step(percept=self.observable_state,
+                                cleaned=self._clean_count - clean_count,
+                                moved=self._agent_location != agent_location)
 
     def update(self, action):
         old_loc = self._agent_location
-        if action == 'UP':
-            new_loc = RoombaWorld.Point(old_loc.x - 1, old_loc.y)
-        elif action == 'DOWN':
-            new_loc = RoombaWorld.Point(old_loc.x + 1, old_loc.y)
-        elif action == 'LEFT':
-            new_loc = RoombaWorld.Point(old_loc.x, old_loc.y - 1)
-        elif action == 'RIGHT':
-            new_loc = RoombaWorld.Point(old_loc.x, old_loc.y + 1)
-        elif action == 'SUCK':
-            new_loc = old_loc
-            self._floor_status[(old_loc.x, old_loc.y)].is_dirty = False
+        if action == 'SUCK':
+            location = self._floor_status[old_loc]
+            if location.is_dirty:
+                location.is_dirty = False
+                self._clean_count += 1
+                self._state = self._observable_state = None
+                if self._dirt is not None:
+                    self._dirt.clean(old_loc)
+                if self._schedule is not None:
+                    self._schedule.clean(old_loc)
         else:
-            raise ValueError(MSG_ILLEGAL_ACTION.format(action))
+            new_loc = self._moves.target(old_loc, action)
+            if new_loc is not old_loc:
+                self._agent_location = new_loc
+                self._state = self._observable_state = None
+        if self._schedule is not None:
+            self._accumulate_dirt()
+
+    def _schedule_dirt(self, dirt_rate, dirt_rate_path):
+        if dirt_rate is None:
+            if dirt_rate_path is not None:
+                raise ValueError(MSG_RATE_PATH_WITHOUT_RATE)
+            return None
+        if len(dirt_rate) != 1:
+            raise ValueError(MSG_WRONG_ARGV_LEN.format(1, 'dirt_rate',
+                                                       repr(dirt_rate)))
+        rate = parse_rate(dirt_rate[0])
+        if dirt_rate_path is None:
+            if rate == 0:
+                return None
+
+            def rates(key):
+                return rate
+        else:
+            if len(dirt_rate_path) != 1:
+                raise ValueError(MSG_WRONG_ARGV_LEN.format(
+                    1, 'dirt_rate_path', repr(dirt_rate_path)))
+            weights = _read_rate_weights(dirt_rate_path[0])
+
+            def rates(key):
+                x, y = self._key_location(key)
+                row = weights[x] if x < len(weights) else b''
+                return rate * (row[y] - ord('0')) / 9 if y < len(row) else 0
+        schedule = DirtSchedule(rates)
+        schedule.start(self._clean_keys())
+        return schedule
+
+    def _accumulate_dirt(self):
+        due = self._schedule.advance()
+        if due:
+            for key in due:
+                self._soil(key)
+                if self._dirt is not None:
+                    self._dirt.soil(key)
+            self._clean_count -= len(due)
+            self._state = self._observable_state = None
+
+    def _clean_keys(self):
+        return [location for location, status in self._floor_status.items()
+                if status.is_passable and not status.is_dirty]
+
+    def _key_location(self, key):
+        return key
 
-        if new_loc in self._floor_status.keys() \
-                and self._floor_status[new_loc].is_passable:
-            self._agent_location = new_loc
+    def _soil(self, key):
+        self._floor_status[key].is_dirty = True
 
     def _initialize_floor_state(self, floor_state_path):
         floor_state_file = open(floor_state_path[0], 'r')
         try:
-            floor_status = RoombaWorld._read_floor_status(floor_state_file)
+            floor_status = self._read_floor_status(floor_state_file)
         finally:
             floor_state_file.close()
         return floor_status
 
+    def _count_clean_locations(self):
+        return len([x for x in self._floor_status.values() if not x.is_dirty])
+
+    def _move_table(self, floor_state_path):
+        return MoveTable(self._floor_status)
+
+    def _index_dirt(self):
+        return DirtIndex(self._floor_status, self._moves)
+
     def _initialize_agent_location(self, agent_location):
         if len(agent_location) != 2:
             raise ValueError(MSG_WRONG_ARGV_LEN.format(2,
@@ -114,6 +282,14 @@ class RoombaWorld(object):
 
 
 class Location(object):
+    """
+    One passable location. is_dirty is a plain slot, so reading and
+    cleaning it costs no more than any attribute access.
+    """
+
+    __slots__ = ('is_dirty',)
+
+    is_passable = True
 
     is_dirty_str = {
         True: STR_DIRTY,
@@ -130,7 +306,7 @@ class Location(object):
             raise TypeError(MSG_INVALID_PARAM.format("is_dirty",
                                                      is_dirty,
                                                      STR_EXPECTED_BOOLEAN))
-        self._is_dirty = is_dirty
+        self.is_dirty = is_dirty
 
     def __eq__(self, other):
         return self.is_dirty == other.is_dirty and \
@@ -140,30 +316,696 @@ class Location(object):
         return REPR_LOCATION.format(Location.is_dirty_str[self.is_dirty],
                                     Location.is_passable_str[self.is_passable])
 
+
+class Obstacle(Location):
+    """
+    Impassable location that is never dirty. Obstacles have no state,
+    so floors share the single OBSTACLE instance.
+    """
+
+    __slots__ = ()
+
+    is_dirty = False
+    is_passable = False
+
+    def __init__(self):
+        pass
+
+
+OBSTACLE = Obstacle()
+
+
+class FloorGrid(Mapping):
+    """
+    Compact floor status: one byte per cell in a contiguous bytearray,
+    indexed row-major by (x, y).
+
+    Behaves as a read-only mapping of (x, y) -> Location, like the dict
+    built by RoombaWorld, so agents and evaluators see the same state.
+    Cells past the end of a short row are CELL_VOID and are not part of
+    the floor.
+
+    A grid built by copy_on_write() shares its cells with other grids
+    until its first change, when it takes a private copy.
+    """
+
+    def __init__(self, cells, width, floor_size=None, shared_clean_count=None):
+        self.cells = cells
+        self.width = width
+        self.height = len(cells) // width if width else 0
+        if floor_size is None:
+            floor_size = len(cells) - cells.count(CELL_VOID)
+        self._len = floor_size
+        self._shared_clean_count = shared_clean_count
+
+    @staticmethod
+    def copy_on_write(floor_map):
+        """
+        Grid over the read-only cells of a cached floor map.
+
+        :param floor_map: FloorMap from a MapCache
+        """
+        return FloorGrid(floor_map.cells, floor_map.width,
+                         floor_size=floor_map.floor_size,
+                         shared_clean_count=floor_map.clean_count)
+
+    @staticmethod
+    def from_lines(lines):
+        rows = []
+        for line in lines:
+            row = line.rstrip()
+            illegal = row.translate(_FLOOR_CHARS)
+            if illegal:
+                raise ValueError(
+                    MSG_ILLEGAL_FLOOR_STATE_CHR.format(illegal[0]))
+            rows.append(row.encode('ascii'))
+        width = max((len(row) for row in rows), default=0)
+        cells = b''.join(row.ljust(width) for row in rows)
+        return FloorGrid(bytearray(cells.translate(_CELL_CODES)), width)
+
+    @staticmethod
+    def from_path(path):
+        """
+        Load a floor state file by memory-mapping it and parsing it in
+        bulk.
+
+        Files whose rows all have the same length and contain nothing
+        but '.', '+', 'x' and newlines are parsed without any
+        per-character or per-row Python work; anything else falls back
+        to from_lines.
+        """
+        with open(path, 'rb') as floor_state_file:
+            try:
+                data = mmap.mmap(floor_state_file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            except ValueError:
+                return FloorGrid(bytearray(), 0)
+            try:
+                grid = FloorGrid._from_rectangular_buffer(data)
+            finally:
+                data.close()
+        if grid is None:
+            with open(path, 'r') as floor_state_file:
+                grid = FloorGrid.from_lines(floor_state_file.readlines())
+        return grid
+
+    @staticmethod
+    def _from_rectangular_buffer(data):
+        size = len(data)
+        width = data.find(b'\n')
+        if width == -1:
+            width = size
+        stride = width + 1
+        if data[size - 1:] == b'\n':
+            size -= 1
+        if width == 0 or (size + 1) % stride:
+            return None
+        height = (size + 1) // stride
+        if data[width:size:stride].count(b'\n') != height - 1:
+            return None
+
+        # Checked and translated a chunk at a time, straight from the
+        # map, so only the cells themselves are ever held in full.
+        cells = bytearray(width * height)
+        position = 0
+        for start in range(0, size, PARSE_CHUNK_SIZE):
+            chunk = data[start:min(start + PARSE_CHUNK_SIZE, size)]
+            if chunk.translate(None, b'.+x\n'):
+                return None
+            codes = chunk.translate(_CELL_CODES, b'\n')
+            if position + len(codes) > len(cells):
+                return None
+            cells[position:position + len(codes)] = codes
+            position += len(codes)
+        if position != len(cells):
+            return None
+        return FloorGrid(cells, width)
+
+    def index(self, x, y):
+        if 0 <= x < self.height and 0 <= y < self.width:
+            index = x * self.width + y
+            if self.cells[index] != CELL_VOID:
+                return index
+        return None
+
+    def count_clean(self):
+        if self._shared_clean_count is not None:
+            return self._shared_clean_count
+        return self.cells.count(CELL_CLEAN) + self.cells.count(CELL_OBSTACLE)
+
+    def set_cell(self, index, cell):
+        if self._shared_clean_count is not None:
+            self.cells = bytearray(self.cells)
+            self._shared_clean_count = None
+        self.cells[index] = cell
+
+    def __getitem__(self, key):
+        index = self.index(*key)
+        if index is None:
+            raise KeyError(key)
+        if self.cells[index] == CELL_OBSTACLE:
+            return OBSTACLE
+        return GridLocation(self, index)
+
+    def __contains__(self, key):
+        return self.index(*key) is not None
+
+    def __iter__(self):
+        width = self.width
+        for index, cell in enumerate(self.cells):
+            if cell != CELL_VOID:
+                yield divmod(index, width)
+
+    def __len__(self):
+        return self._len
+
+
+class GridLocation(Location):
+    """
+    Passable Location backed by one cell of a FloorGrid.
+    """
+
+    __slots__ = ('_grid', '_index')
+
+    def __init__(self, grid, index):
+        self._grid = grid
+        self._index = index
+
     @property
     def is_dirty(self):
-        return self._is_dirty
+        return self._grid.cells[self._index] == CELL_DIRTY
 
     @is_dirty.setter
     def is_dirty(self, is_dirty):
-        self._is_dirty = is_dirty
+        self._grid.set_cell(self._index,
+                            CELL_DIRTY if is_dirty else CELL_CLEAN)
+
+
+class MoveTable(object):
+    """
+    Where each of MOVES leads from each passable location of a floor.
+
+    The targets of a location are worked out the first time it is
+    visited and kept, since obstacles never change. A move that would
+    leave the floor or enter an obstacle targets the location it
+    started from.
+    """
+
+    def __init__(self, floor_status):
+        """
+        :param floor_status: mapping of (x, y) -> Location
+        """
+        self._floor_status = floor_status
+        self._targets = {}
+
+    def targets(self, location):
+        """
+        :return: tuple of target locations, in the order of MOVES
+        """
+        targets = self._targets.get(location)
+        if targets is None:
+            targets = self._targets[location] = self._find_targets(location)
+        return targets
+
+    def target(self, location, action):
+        slot = _MOVE_SLOTS.get(action)
+        if slot is None:
+            raise ValueError(MSG_ILLEGAL_ACTION.format(action))
+        return self.targets(location)[slot]
+
+    def _find_targets(self, location):
+        targets = []
+        for dx, dy in MOVE_OFFSETS:
+            target = self._neighbor(location, dx, dy)
+            targets.append(location if target is None else target)
+        return tuple(targets)
+
+    def _neighbor(self, location, dx, dy):
+        target = RoombaWorld.Point(location[0] + dx, location[1] + dy)
+        if target in self._floor_status \
+                and self._floor_status[target].is_passable:
+            return target
+        return None
+
+
+class NeighborIndex(MoveTable):
+    """
+    MoveTable over the cell indexes of one floor map, with
+    shortest-path distances. Obstacles never change, so a single index
+    serves every grid loaded from the same map.
+    """
+
+    def __init__(self, cells, width, distance_cache_size=DISTANCE_CACHE_SIZE):
+        """
+        :param cells: cell codes of the map, row-major
+        :param width: cells per row
+        :param distance_cache_size: how many sources to keep the
+          distances() of
+        """
+        MoveTable.__init__(self, None)
+        self._cells = cells
+        self._width = width
+        self._points = {}
+        self._distances = OrderedDict()
+        self._distance_cache_size = distance_cache_size
+
+    def point(self, index):
+        """
+        The location of a cell as a RoombaWorld.Point. Points are
+        interned, so moving back and forth allocates nothing.
+        """
+        point = self._points.get(index)
+        if point is None:
+            point = self._points[index] = RoombaWorld.Point(
+                *divmod(index, self._width))
+        return point
+
+    def distances(self, source):
+        """
+        Number of moves from source to every cell, by breadth-first
+        search. The most recently used sources are cached.
+
+        :return: array of distances by cell index; -1 for cells that
+          cannot be reached
+        """
+        distances = self._distances.get(source)
+        if distances is not None:
+            self._distances.move_to_end(source)
+            return distances
+        distances = array('l', [-1]) * len(self._cells)
+        distances[source] = 0
+        frontier = deque()
+        if self._cells[source] in (CELL_CLEAN, CELL_DIRTY):
+            frontier.append(source)
+        while frontier:
+            index = frontier.popleft()
+            distance = distances[index] + 1
+            for target in self.targets(index):
+                if distances[target] == -1:
+                    distances[target] = distance
+                    frontier.append(target)
+        self._distances[source] = distances
+        if len(self._distances) > self._distance_cache_size:
+            self._distances.popitem(last=False)
+        return distances
+
+    def route(self, source, target):
+        """
+        The moves along a shortest path from source to target.
+
+        :return: list of actions from MOVES, or None if target cannot
+          be reached
+        """
+        distances = self.distances(target)
+        if distances[source] == -1:
+            return None
+        route = []
+        index = source
+        while index != target:
+            for action, next_index in zip(MOVES, self.targets(index)):
+                if distances[next_index] == distances[index] - 1:
+                    route.append(action)
+                    index = next_index
+                    break
+        return route
+
+    def _neighbor(self, index, dx, dy):
+        width = self._width
+        x, y = divmod(index, width)
+        if 0 <= x + dx < len(self._cells) // width and 0 <= y + dy < width:
+            target = index + dx * width + dy
+            if self._cells[target] in (CELL_CLEAN, CELL_DIRTY):
+                return target
+        return None
+
+
+class DirtIndex(object):
+    """
+    The dirty locations of a RoombaWorld floor, kept as a set that the
+    environment updates each time the agent cleans, so questions about
+    the remaining dirt never scan the whole floor.
+    """
+
+    def __init__(self, floor_status, moves):
+        """
+        :param floor_status: mapping of (x, y) -> Location
+        :param moves: MoveTable of the same floor
+        """
+        self._dirty = {location for location, status in floor_status.items()
+                       if status.is_dirty}
+        self._floor_status = floor_status
+        self._moves = moves
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def __contains__(self, location):
+        return location in self._dirty
+
+    def __iter__(self):
+        return iter(self._dirty)
 
     @property
-    def is_passable(self):
-        return True
+    def is_clean(self):
+        return not len(self)
 
+    def clean(self, key):
+        """
+        Record that a dirty location has just been cleaned.
 
-class Obstacle(Location):
+        :param key: the location, as the environment's MoveTable keys
+          it
+        """
+        self._dirty.remove(key)
 
-    def __init__(self):
-        Location.__init__(self, is_dirty=False)
+    def soil(self, key):
+        """
+        Record that a clean location has just got dirty.
+        """
+        self._dirty.add(key)
+
+    def nearest(self, location):
+        """
+        A dirty location with the fewest moves from the given one, by
+        breadth-first search.
+
+        :param location: (x, y) to search from
+        :return: (location, moves) tuple, or None if no dirty location
+          can be reached
+        """
+        if self.is_clean:
+            return None
+        source = self._key(location)
+        if source is None:
+            return None
+        distances = {source: 0}
+        frontier = deque((source,))
+        while frontier:
+            key = frontier.popleft()
+            if self._is_dirty(key):
+                return self._location(key), distances[key]
+            distance = distances[key] + 1
+            for target in self._moves.targets(key):
+                if target not in distances:
+                    distances[target] = distance
+                    frontier.append(target)
+        return None
+
+    def _key(self, location):
+        location = RoombaWorld.Point(*location)
+        status = self._floor_status.get(location)
+        if status is None or not status.is_passable:
+            return None
+        return location
+
+    def _is_dirty(self, key):
+        return key in self._dirty
+
+    def _location(self, key):
+        return key
+
+
+class GridDirtIndex(DirtIndex):
+    """
+    DirtIndex of a FloorGrid. The grid's cells already mark every dirty
+    location, so only the count is kept, and the dirty locations are
+    found with byte searches over the cells.
+    """
+
+    def __init__(self, grid, neighbors, count):
+        """
+        :param grid: FloorGrid of the environment
+        :param neighbors: NeighborIndex of the grid's map
+        :param count: number of dirty locations
+        """
+        self._grid = grid
+        self._moves = neighbors
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, location):
+        index = self._key(location)
+        return index is not None and self._is_dirty(index)
+
+    def __iter__(self):
+        for index in _find_cells(self._grid.cells, CELL_DIRTY):
+            yield self._location(index)
+
+    def clean(self, key):
+        self._count -= 1
+
+    def soil(self, key):
+        self._count += 1
+
+    def _key(self, location):
+        index = self._grid.index(*location)
+        if index is None or self._grid.cells[index] == CELL_OBSTACLE:
+            return None
+        return index
+
+    def _is_dirty(self, key):
+        return self._grid.cells[key] == CELL_DIRTY
+
+    def _location(self, key):
+        return self._moves.point(key)
+
+
+FloorMap = namedtuple('FloorMap', ['stamp', 'cells', 'width', 'floor_size',
+                                   'clean_count'])
+SharedFloorMap = namedtuple('SharedFloorMap', ['path', 'name', 'size', 'stamp',
+                                               'width', 'floor_size',
+                                               'clean_count'])
+
+
+class MapCache(object):
+    """
+    Parses each floor state file once, keyed by its path, modification
+    time and size, and hands out copy-on-write FloorGrids over the
+    parsed cells.
+
+    The cells can be placed in shared memory so that worker processes
+    attach to them instead of parsing the file again.
+
+    Only the most recently used maps, and their NeighborIndexes, are
+    kept. Maps attached from shared memory stay until detach().
+    """
+
+    def __init__(self, size=MAP_CACHE_SIZE):
+        """
+        :param size: how many parsed maps to keep
+        """
+        self._maps = OrderedDict()
+        self._neighbors = {}
+        self._attached = []
+        self._size = size
+
+    def load(self, path):
+        return FloorGrid.copy_on_write(self.floor_map(path))
+
+    def floor_map(self, path):
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        floor_map = self._maps.get(path)
+        if floor_map is None or floor_map.stamp != stamp:
+            grid = FloorGrid.from_path(path)
+            floor_map = FloorMap(stamp=stamp,
+                                 cells=bytes(grid.cells),
+                                 width=grid.width,
+                                 floor_size=len(grid),
+                                 clean_count=grid.count_clean())
+            self._maps[path] = floor_map
+            self._evict()
+        self._maps.move_to_end(path)
+        return floor_map
+
+    def neighbors(self, path):
+        """
+        The NeighborIndex of a floor map, built on first use.
+
+        :param path: floor state file path
+        """
+        floor_map = self.floor_map(path)
+        path = os.path.realpath(path)
+        stamp, neighbors = self._neighbors.get(path, (None, None))
+        if neighbors is None or stamp != floor_map.stamp:
+            neighbors = NeighborIndex(floor_map.cells, floor_map.width)
+            self._neighbors[path] = (floor_map.stamp, neighbors)
+        return neighbors
+
+    @contextmanager
+    def shared(self, paths):
+        """
+        Copy the cells of each floor map into shared memory for as long
+        as the context lasts.
+
+        :param paths: floor state file paths
+        :return: picklable list of SharedFloorMaps to pass to attach()
+          in other processes
+        """
+        blocks = []
+        shared_maps = []
+        try:
+            for path in paths:
+                floor_map = self.floor_map(path)
+                size = len(floor_map.cells)
+                block = shared_memory.SharedMemory(create=True,
+                                                   size=max(size, 1))
+                blocks.append(block)
+                block.buf[:size] = floor_map.cells
+                shared_maps.append(SharedFloorMap(
+                    path=os.path.realpath(path), name=block.name, size=size,
+                    stamp=floor_map.stamp, width=floor_map.width,
+                    floor_size=floor_map.floor_size,
+                    clean_count=floor_map.clean_count))
+            yield shared_maps
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def attach(self, shared_maps):
+        """
+        Use floor maps another process placed in shared memory.
+
+        :param shared_maps: SharedFloorMaps from shared()
+        """
+        if not self._attached:
+            atexit.register(self.detach)
+        for shared_map in shared_maps:
+            block = shared_memory.SharedMemory(name=shared_map.name)
+            self._attached.append(block)
+            view = block.buf[:shared_map.size]
+            cells = view.toreadonly()
+            view.release()
+            self._maps[shared_map.path] = FloorMap(
+                stamp=shared_map.stamp, cells=cells, width=shared_map.width,
+                floor_size=shared_map.floor_size,
+                clean_count=shared_map.clean_count)
+
+    def _evict(self):
+        for path in list(self._maps):
+            if len(self._maps) <= self._size:
+                break
+            if not isinstance(self._maps[path].cells, memoryview):
+                del self._maps[path]
+                self._neighbors.pop(path, None)
+
+    def detach(self):
+        """
+        Forget the floor maps attached from shared memory. Grids still
+        sharing their cells must not be used afterwards.
+        """
+        for path, floor_map in list(self._maps.items()):
+            if isinstance(floor_map.cells, memoryview):
+                del self._maps[path]
+                self._neighbors.pop(path, None)
+                floor_map.cells.release()
+        for block in self._attached:
+            block.close()
+        self._attached = []
+
+
+MAP_CACHE = MapCache()
+
+
+class GridRoombaWorld(RoombaWorld):
+    """
+    RoombaWorld whose floor is stored in a FloorGrid rather than a dict
+    of Location objects.
+
+    Floors come from MAP_CACHE, so each floor state file is parsed once
+    per process, or not at all in worker processes that attached to
+    the maps shared by share_resources().
+    """
+
+    @staticmethod
+    def share_resources(environment_args):
+        paths = environment_args.get('floor_state_path', [])[:1]
+        return MAP_CACHE.shared(paths)
+
+    @staticmethod
+    def attach_shared_resources(shared_maps):
+        MAP_CACHE.attach(shared_maps)
+
+    def __init__(self, agent_location, floor_state_path, dirt_rate=None,
+                 dirt_rate_path=None):
+        RoombaWorld.__init__(self, agent_location, floor_state_path,
+                             dirt_rate, dirt_rate_path)
+        self._agent_index = self._floor_status.index(*self._agent_location)
+
+    @property
+    def observable_state(self):
+        observable_state = self._observable_state
+        if observable_state is None:
+            is_dirty = \
+                self._floor_status.cells[self._agent_index] == CELL_DIRTY
+            observable_state = self._observable_state = \
+                RoombaWorld.ObservableState(
+                    agent_location=self._agent_location, is_dirty=is_dirty)
+        return observable_state
 
     @property
-    def is_passable(self):
-        return False
+    def neighbors(self):
+        """
+        The NeighborIndex of this world's floor map, for agents that
+        plan their routes.
+        """
+        return self._moves
+
+    def update(self, action):
+        if action == 'SUCK':
+            grid = self._floor_status
+            if grid.cells[self._agent_index] == CELL_DIRTY:
+                grid.set_cell(self._agent_index, CELL_CLEAN)
+                self._clean_count += 1
+                self._state = self._observable_state = None
+                if self._dirt is not None:
+                    self._dirt.clean(self._agent_index)
+                if self._schedule is not None:
+                    self._schedule.clean(self._agent_index)
+        else:
+            index = self._moves.target(self._agent_index, action)
+            if index != self._agent_index:
+                self._agent_location = self._moves.point(index)
+                self._agent_index = index
+                self._state = self._observable_state = None
+        if self._schedule is not None:
+            self._accumulate_dirt()
+
+    def _count_clean_locations(self):
+        return self._floor_status.count_clean()
+
+    def _clean_keys(self):
+        return _find_cells(self._floor_status.cells, CELL_CLEAN)
+
+    def _key_location(self, key):
+        return self._moves.point(key)
+
+    def _soil(self, key):
+        self._floor_status.set_cell(key, CELL_DIRTY)
+
+    def _move_table(self, floor_state_path):
+        return MAP_CACHE.neighbors(floor_state_path[0])
+
+    def _index_dirt(self):
+        return GridDirtIndex(self._floor_status, self._moves,
+                             len(self._floor_status) - self._clean_count)
+
+    def _initialize_floor_state(self, floor_state_path):
+        return MAP_CACHE.load(floor_state_path[0])
 
 
 class CleanFloorEvaluator(object):
+    """
+    Scores one point per clean location per time step by scanning the
+    whole floor on every update.
+
+    This is the reference implementation; prefer
+    IncrementalCleanFloorEvaluator for anything but tiny floors.
+    """
 
     def __init__(self):
         self._score = 0
@@ -172,22 +1014,126 @@ class CleanFloorEvaluator(object):
         locations = state.floor_status.values()
         self._score += len([x for x in locations if not x.is_dirty])
 
+    def credit(self, points):
+        self._score += points
+
     @property
     def score(self):
         return self._score
 
 
+class IncrementalCleanFloorEvaluator(CleanFloorEvaluator):
+    """
+    Scores the same as CleanFloorEvaluator, but in O(1) per update by
+    reading the environment's running clean-location counter.
+
+    States without a counter (clean_count is None) fall back to the
+    full scan.
+
+    It can also keep its own count, from the clean locations of the
+    initial state passed to start() and the locations each Step
+    cleaned since, for environments with a step() method.
+    """
+
+    def __init__(self):
+        CleanFloorEvaluator.__init__(self)
+        self._clean_count = None
+
+    def update(self, state):
+        if state.clean_count is None:
+            CleanFloorEvaluator.update(self, state)
+        else:
+            self._score += state.clean_count
+
+    def start(self, state):
+        if state.clean_count is None:
+            self._clean_count = len([x for x in state.floor_status.values()
+                                     if not x.is_dirty])
+        else:
+            self._clean_count = state.clean_count
+
+    def update_step(self, step):
+        self._clean_count += step.cleaned
+        self._score += self._clean_count
+
+
 class RandomReflexAgent(object):
+    """
+    Sucks where there is dirt and moves in a uniformly random direction
+    everywhere else.
 
-    action = {
-        0: 'UP',
-        1: 'DOWN',
-        2: 'LEFT',
-        3: 'RIGHT'
-    }
+    Without a seed, moves come from the random module, so seeding it
+    (as run_trials does for each trial) makes runs repeatable. With a
+    seed, the agent draws from a generator of its own.
+
+    With a block size, moves are drawn that many at a time as random
+    bytes and handed out one per step, so most steps make no call into
+    the generator at all.
+    """
+
+    def __init__(self, seed=None, block_size=None):
+        """
+        :param seed: list holding an integer seed for this agent's own
+          random number generator
+        :param block_size: list holding the number of moves to draw at
+          a time
+        """
+        if seed is None:
+            self._rng = random
+        else:
+            self._rng = random.Random(_single_int('seed', seed))
+        if block_size is None:
+            self._block_size = 0
+        else:
+            self._block_size = _single_int('block_size', block_size)
+            if self._block_size < 1:
+                raise ValueError(MSG_INVALID_PARAM.format(
+                    'block_size', self._block_size, STR_EXPECTED_POSITIVE))
+        self._block = b''
+        self._next = 0
 
     def decide(self, state):
         if state.is_dirty:
             return 'SUCK'
-        else:
-            return RandomReflexAgent.action[random.randint(0, 3)]
+        if not self._block_size:
+            return MOVES[self._rng.randint(0, 3)]
+        i = self._next
+        if i == len(self._block):
+            self._block = self._rng.randbytes(
+                self._block_size).translate(_MOVE_CODES)
+            i = 0
+        self._next = i + 1
+        return MOVES[self._block[i]]
+
+
+def _find_cells(cells, code):
+    # Cells attached from shared memory are a memoryview, which cannot
+    # be searched in place.
+    if isinstance(cells, memoryview):
+        cells = bytes(cells)
+    target = bytes((code,))
+    index = cells.find(target)
+    while index != -1:
+        yield index
+        index = cells.find(target, index + 1)
+
+
+def _read_rate_weights(path):
+    with open(path, 'rb') as weights_file:
+        rows = [line.rstrip() for line in weights_file]
+    for row in rows:
+        illegal = row.translate(None, b'0123456789')
+        if illegal:
+            raise ValueError(MSG_ILLEGAL_RATE_WEIGHT_CHR.format(
+                chr(illegal[0])))
+    return rows
+
+
+def _single_int(name, values):
+    if len(values) != 1:
+        raise ValueError(MSG_WRONG_ARGV_LEN.format(1, name, repr(values)))
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ValueError(MSG_INVALID_PARAM.format(name, values[0],
+                                                  STR_EXPECTED_INTEGER))
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture
+def floor_path(tmp_path):
+    def write_floor(lines, name='floor'):
+        path = tmp_path / name
+        path.write_text(''.join(lines))
+        return str(path)
+    return write_floor
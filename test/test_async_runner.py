@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from async_runner import *
+from vacuum_world import (BasicVacuumWorld, CleanFloorEvaluator,
+                          ExperimentError, SuckyAgent)
+
+
+class DelayedAgent(object):
+    """
+    Stands in for an agent behind a model server: every decision takes
+    a fixed delay.
+    """
+
+    in_flight = 0
+    most_in_flight = 0
+
+    def __init__(self, delay):
+        self._delay = delay
+
+    async def decide(self, percept):
+        DelayedAgent.in_flight += 1
+        DelayedAgent.most_in_flight = max(DelayedAgent.most_in_flight,
+                                          DelayedAgent.in_flight)
+        try:
+            await asyncio.sleep(self._delay)
+        finally:
+            DelayedAgent.in_flight -= 1
+        return 'SUCK' if percept["is_dirty"] else 'RIGHT'
+
+
+def _experiments(agents):
+    return [(BasicVacuumWorld(dirt_status=['t', 't'], agent_location=['A']),
+             agent, CleanFloorEvaluator()) for agent in agents]
+
+
+@pytest.fixture(autouse=True)
+def reset_in_flight():
+    DelayedAgent.in_flight = DelayedAgent.most_in_flight = 0
+
+
+def test_overlaps_agent_latency():
+    experiments = _experiments(DelayedAgent(0.02) for _ in range(20))
+    start = time.perf_counter()
+    scores = run_experiments(experiments, steps=5)
+    elapsed = time.perf_counter() - start
+    assert scores == [1 + 1 + 2 + 2 + 2] * 20
+    # One after the other, these would take 20 * 5 * 0.02 = 2 seconds.
+    assert elapsed < 1
+
+
+def test_limits_concurrency():
+    run_experiments(_experiments(DelayedAgent(0.001) for _ in range(10)),
+                    steps=3, concurrency=4)
+    assert DelayedAgent.most_in_flight == 4
+
+
+def test_accepts_plain_agents():
+    scores = run_experiments(_experiments([SuckyAgent(), DelayedAgent(0)]),
+                             steps=4)
+    assert scores == [1 + 1 + 1 + 1, 1 + 1 + 2 + 2]
+
+
+def test_reports_failing_agents():
+    class BrokenAgent(object):
+        async def decide(self, percept):
+            raise RuntimeError
+
+    with pytest.raises(ExperimentError) as e:
+        run_experiments(_experiments([BrokenAgent()]), steps=1)
+    assert e.value.component == 'agent'
@@ -137,3 +137,27 @@ def test_left_at_b_goes_to_a():
                                    dirt_status=['t', 't'])
     environment.update('LEFT')
     assert environment.observable_state['agent_location'] == 'A'
+
+
+def test_dirt_comes_back_at_its_rate():
+    environment = BasicVacuumWorld(dirt_status=['t', 'f'],
+                                   dirt_rate=['1', '0'])
+    assert not environment.is_quiescent
+    environment.update('SUCK')
+    assert environment.state['dirt_status'] == {'A': True, 'B': False}
+    environment.update('RIGHT')
+    assert environment.state['dirt_status'] == {'A': True, 'B': False}
+
+
+def test_random_dirt_has_no_state_key():
+    assert BasicVacuumWorld(dirt_rate=['0.5']).state_key is None
+    assert BasicVacuumWorld(dirt_rate=['0']).state_key is not None
+    assert BasicVacuumWorld(dirt_status=['f', 'f'],
+                            dirt_rate=['0']).is_quiescent
+
+
+@pytest.mark.parametrize('dirt_rate', [['0.1', '0.2', '0.3'], ['-1'],
+                                       ['lots']])
+def test_rejects_bad_dirt_rates(dirt_rate):
+    with pytest.raises(ValueError):
+        BasicVacuumWorld(dirt_rate=dirt_rate)
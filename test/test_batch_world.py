@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from batch_world import *
+from roomba_world import FloorGrid, GridRoombaWorld
+
+
+FLOOR_LINES = ['+.+\n', '+x+\n', '.+\n']
+
+
+class TestBatchRoombaWorld(object):
+    def test_matches_single_worlds(self, floor_path):
+        path = floor_path(FLOOR_LINES)
+        starts = [(0, 0), (0, 2), (2, 1)]
+        grids = [FloorGrid.from_lines(FLOOR_LINES) for _ in starts]
+        batch = BatchRoombaWorld(grids, starts)
+        singles = [GridRoombaWorld(agent_location=[str(x), str(y)],
+                                   floor_state_path=[path])
+                   for (x, y) in starts]
+        codes = np.random.default_rng(0).integers(0, len(ACTIONS),
+                                                  size=(50, len(starts)))
+        for actions in codes:
+            batch.update(actions)
+            for world, action in zip(singles, actions):
+                world.update(ACTIONS[action])
+            observable = batch.observable_state
+            for i, world in enumerate(singles):
+                assert tuple(observable.agent_locations[i]) == \
+                    world.state.agent_location
+                assert observable.is_dirty[i] == \
+                    world.observable_state.is_dirty
+                assert batch.state.clean_count[i] == world.state.clean_count
+
+    def test_pads_floors_of_different_sizes(self):
+        grids = [FloorGrid.from_lines(['..\n']),
+                 FloorGrid.from_lines(['.\n', '+\n'])]
+        batch = BatchRoombaWorld(grids, [(0, 0), (0, 0)])
+        batch.update([DOWN, RIGHT])
+        assert batch.agent_locations.tolist() == [[0, 0], [0, 0]]
+        batch.update([RIGHT, DOWN])
+        assert batch.agent_locations.tolist() == [[0, 1], [1, 0]]
+        assert batch.state.clean_count.tolist() == [2, 1]
+
+    def test_rejects_impassable_or_out_of_bounds_start(self):
+        grid = FloorGrid.from_lines(['.x\n'])
+        for start in ((0, 1), (1, 0), (0, -1)):
+            with pytest.raises(ValueError):
+                BatchRoombaWorld([grid], [start])
+
+    def test_rejects_other_actions(self):
+        batch = BatchRoombaWorld([FloorGrid.from_lines(['.\n'])], [(0, 0)])
+        with pytest.raises(ValueError):
+            batch.update([len(ACTIONS)])
+        with pytest.raises(ValueError):
+            batch.update([SUCK, SUCK])
+
+
+class TestBatchCleanFloorEvaluator(object):
+    def test_scores_each_world(self):
+        grids = [FloorGrid.from_lines(['+.\n']),
+                 FloorGrid.from_lines(['++\n'])]
+        batch = BatchRoombaWorld(grids, [(0, 0), (0, 0)])
+        evaluator = BatchCleanFloorEvaluator()
+        run_batch_experiment(batch, _Sucky(), evaluator, steps=3)
+        assert evaluator.score.tolist() == [6, 3]
+
+
+class TestBatchRandomReflexAgent(object):
+    def test_sucks_with_dirt_and_moves_without(self):
+        agent = BatchRandomReflexAgent(seed=1)
+        percept = BatchRoombaWorld.ObservableState(
+            agent_locations=np.zeros((1000, 2)),
+            is_dirty=np.arange(1000) % 2 == 0)
+        actions = agent.decide(percept)
+        assert (actions[::2] == SUCK).all()
+        assert set(actions[1::2].tolist()) == {UP, DOWN, LEFT, RIGHT}
+
+    def test_seed_is_reproducible(self):
+        percept = BatchRoombaWorld.ObservableState(
+            agent_locations=np.zeros((100, 2)),
+            is_dirty=np.zeros(100, dtype=bool))
+        first = BatchRandomReflexAgent(seed=7).decide(percept)
+        second = BatchRandomReflexAgent(seed=7).decide(percept)
+        assert (first == second).all()
+
+
+class _Sucky(object):
+    def decide(self, percept):
+        return np.full(len(percept.is_dirty), SUCK)
@@ -0,0 +1,54 @@
+import json
+import os
+from unittest.mock import Mock
+
+import benchmark
+from roomba_world import RoombaWorld
+
+
+def test_emits_json_report(capsys):
+    benchmark.main(['--scales', '1', '2', '--steps', '5', '--repeat', '1'])
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["steps"] == 5
+    benchmarks = {(r["benchmark"], r["environment"], r["component"])
+                  for r in report["results"]}
+    assert ('run_experiment', 'RoombaWorld', 'RandomReflexAgent') in benchmarks
+    assert ('update', 'GridRoombaWorld', 'GridRoombaWorld') in benchmarks
+    assert ('observable_state', 'RoombaWorld', 'RoombaWorld') in benchmarks
+    assert ('CleanFloorEvaluator.update', 'GridRoombaWorld',
+            'IncrementalCleanFloorEvaluator') in benchmarks
+    assert ('ReflexAgent.decide', 'BasicVacuumWorld',
+            'ReflexAgent') in benchmarks
+    for result in report["results"]:
+        assert result["seconds"] >= 0
+        assert result["calls"] >= 1
+
+
+def test_tiles_example_maps(tmp_path):
+    path, start = benchmark._write_tiled_map(str(tmp_path), 'donut_world', 3)
+    with open(path) as tiled:
+        rows = tiled.read().split()
+    assert len(rows) == 7 * 3
+    assert all(len(row) == 9 * 3 for row in rows)
+    assert rows[start[0]][start[1]] != 'x'
+
+
+def test_writes_report_to_file(tmp_path):
+    path = tmp_path / "report.json"
+    benchmark.main(['--scales', '1', '--steps', '2', '--repeat', '1',
+                    '--output', str(path)])
+    assert json.loads(path.read_text())["results"]
+
+
+def test_times_fresh_states(monkeypatch):
+    environment = RoombaWorld(agent_location=['0', '0'],
+                              floor_state_path=[os.path.join(
+                                  benchmark.EXAMPLE_DIR, 'linear_world')])
+    build = Mock(side_effect=RoombaWorld.ObservableState)
+    monkeypatch.setattr(RoombaWorld, 'ObservableState', build)
+
+    benchmark._time_property(environment, 'observable_state', 11)
+
+    assert build.call_count >= 11
+    assert environment.observable_state.agent_location == (0, 0)
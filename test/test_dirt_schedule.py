@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from dirt_schedule import *
+
+
+def test_waits_are_geometric():
+    schedule = DirtSchedule(lambda key: 0.1, rng=random.Random(0))
+    schedule.start(range(10000))
+    waits = []
+    for t in range(1, 200):
+        waits.extend([t] * len(schedule.advance()))
+    assert len(waits) == pytest.approx(10000, rel=0.01)
+    assert sum(waits) / len(waits) == pytest.approx(10, rel=0.05)
+    assert min(waits) == 1
+
+
+def test_certain_dirt_is_due_on_the_next_step():
+    schedule = DirtSchedule({'a': 1, 'b': 0}.get)
+    schedule.start(['a', 'b'])
+    assert len(schedule) == 1
+    assert schedule.advance() == ['a']
+    assert not schedule
+    schedule.clean('a')
+    schedule.clean('b')
+    assert schedule.advance() == ['a']
+
+
+def test_seeded_schedules_repeat():
+    runs = []
+    for _ in range(2):
+        schedule = DirtSchedule(lambda key: 0.3, rng=random.Random(1))
+        schedule.start(range(50))
+        runs.append([sorted(schedule.advance()) for _ in range(10)])
+    assert runs[0] == runs[1]
+
+
+@pytest.mark.parametrize('string', ['-0.1', '1.5', 'often'])
+def test_rejects_bad_rates(string):
+    with pytest.raises(ValueError):
+        parse_rate(string)
@@ -0,0 +1,139 @@
+import random
+
+import pytest
+
+from fleet_world import *
+from roomba_world import (CleanFloorEvaluator, IncrementalCleanFloorEvaluator,
+                          RandomReflexAgent)
+from vacuum_world import ExperimentError, SuckyAgent
+
+
+def _locations(world):
+    return [percept.agent_location for percept in world.observable_states]
+
+
+def test_percepts_follow_each_robot(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0', '1', '1'],
+                             floor_state_path=[floor_path(['+.\n',
+                                                           '.+\n'])])
+    assert world.observable_states == [((0, 0), True), ((1, 1), True)]
+    world.update(['SUCK', 'UP'])
+    assert world.observable_states == [((0, 0), False), ((0, 1), False)]
+    assert world.state == FleetRoombaWorld.State(
+        floor_status=world.state.floor_status,
+        agent_locations=((0, 0), (0, 1)), clean_count=3)
+    assert not world.is_quiescent
+
+
+def test_lower_numbered_robots_move_first(floor_path):
+    path = floor_path(['...\n'])
+    world = FleetRoombaWorld(agent_locations=['0', '0', '0', '2'],
+                             floor_state_path=[path])
+    world.update(['RIGHT', 'LEFT'])
+    assert _locations(world) == [(0, 1), (0, 2)]
+
+    world = FleetRoombaWorld(agent_locations=['0', '1', '0', '2'],
+                             floor_state_path=[path])
+    world.update(['LEFT', 'LEFT'])
+    assert _locations(world) == [(0, 0), (0, 1)]
+    world.update(['RIGHT', 'RIGHT'])
+    assert _locations(world) == [(0, 0), (0, 2)]
+
+
+def test_robots_cannot_swap_places(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0', '0', '1'],
+                             floor_state_path=[floor_path(['..\n'])])
+    world.update(['RIGHT', 'LEFT'])
+    assert _locations(world) == [(0, 0), (0, 1)]
+    assert world.state.agent_locations == ((0, 0), (0, 1))
+
+
+@pytest.mark.parametrize('agent_locations', [[], ['0'], ['0', '0', '0', '0'],
+                                             ['0', '2'], ['0', '5']])
+def test_rejects_bad_agent_locations(floor_path, agent_locations):
+    with pytest.raises(ValueError):
+        FleetRoombaWorld(agent_locations=agent_locations,
+                         floor_state_path=[floor_path(['..x\n'])])
+
+
+def test_rejects_wrong_number_of_actions(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0'],
+                             floor_state_path=[floor_path(['.\n'])])
+    with pytest.raises(ValueError):
+        world.update(['SUCK', 'SUCK'])
+
+
+def test_bad_actions_change_nothing(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0', '0', '2'],
+                             floor_state_path=[floor_path(['+..\n'])])
+    state = world.state
+    with pytest.raises(ValueError):
+        world.update(['SUCK', 'JUMP'])
+    assert world.state is state
+    assert world.observable_states == [((0, 0), True), ((0, 2), False)]
+    assert world.state.clean_count == 2
+
+
+def test_dirt_comes_back_under_robots(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0'],
+                             floor_state_path=[floor_path(['+.\n'])],
+                             dirt_rate=['1'])
+    world.update(['SUCK'])
+    assert world.observable_states == [((0, 0), True)]
+    assert world.state.clean_count == 0
+
+
+def test_fleet_cleans_faster_than_one_robot(floor_path):
+    path = floor_path(['+' * 12 + '\n'] * 12)
+    scores = []
+    for robots in (1, 8):
+        random.seed(0)
+        world = FleetRoombaWorld(
+            agent_locations=[str(c) for i in range(robots)
+                             for c in (i, i)],
+            floor_state_path=[path])
+        evaluator = IncrementalCleanFloorEvaluator()
+        run_fleet_experiment(world, [RandomReflexAgent()
+                                     for _ in range(robots)],
+                             evaluator, steps=100)
+        scores.append(evaluator.score)
+    assert scores[1] > 2 * scores[0]
+
+
+def test_evaluators_agree(floor_path):
+    path = floor_path(['+.+x\n', '..++\n', 'x+.+\n'])
+    scores = []
+    for evaluator in (CleanFloorEvaluator(),
+                      IncrementalCleanFloorEvaluator()):
+        random.seed(1)
+        world = FleetRoombaWorld(agent_locations=['0', '0', '2', '3'],
+                                 floor_state_path=[path], dirt_rate=['0.1'])
+        run_fleet_experiment(world, [RandomReflexAgent(seed=['2']),
+                                     RandomReflexAgent(seed=['3'])],
+                             evaluator, steps=50)
+        scores.append(evaluator.score)
+    assert scores[0] == scores[1]
+
+
+def test_early_termination_credits_remaining_ticks(floor_path):
+    world = FleetRoombaWorld(agent_locations=['0', '0', '0', '1'],
+                             floor_state_path=[floor_path(['++\n'])])
+    evaluator = IncrementalCleanFloorEvaluator()
+    run_fleet_experiment(world, [SuckyAgent(), SuckyAgent()], evaluator,
+                         steps=10, early_termination=True)
+    assert evaluator.score == 2 * 10
+
+
+def test_reports_failing_agents(floor_path):
+    class BrokenAgent(object):
+        def decide(self, percept):
+            raise RuntimeError
+
+    world = FleetRoombaWorld(agent_locations=['0', '0'],
+                             floor_state_path=[floor_path(['.\n'])])
+    with pytest.raises(ExperimentError) as e:
+        run_fleet_experiment(world, [BrokenAgent()],
+                             IncrementalCleanFloorEvaluator(), steps=1)
+    assert e.value.component == 'agent'
+    with pytest.raises(ValueError):
+        run_fleet_experiment(world, [], IncrementalCleanFloorEvaluator())
@@ -1,9 +1,19 @@
+import io
+import logging
+import random
 import sys
 from unittest.mock import Mock, PropertyMock
 
 import pytest
 
 import vacuum_world
+import profiling
+from memoizing_agent import MemoizingAgent
+from profiling import PhaseProfiler
+from reflex_agent import ReflexAgent
+from roomba_world import (GridRoombaWorld, IncrementalCleanFloorEvaluator,
+                          RandomReflexAgent)
+from trajectory import RecordingEnvironment, read_trajectories, replay
 from vacuum_world import MSG_AGENT_DECISION, MSG_COMPLETE, MSG_HELLO, MSG_SCORE
 
 get_logger = None
@@ -38,6 +48,180 @@ def test_run_experiment_loops_1000_times(monkeypatch):
     assert logger.info.call_count == 1000
 
 
+def test_run_experiment_loops_requested_steps(logger):
+    agent = Mock()
+    vacuum_world.run_experiment(Mock(), agent, Mock(), steps=7)
+    assert agent.decide.call_count == 7
+
+
+def test_early_termination_credits_remaining_steps(logger):
+    for dirt_status in (['t', 't'], ['t', 'f'], ['f', 't'], ['f', 'f']):
+        for agent in (vacuum_world.SuckyAgent(), ReflexAgent()):
+            scores = []
+            decisions = []
+            for early_termination in (False, True):
+                environment = vacuum_world.BasicVacuumWorld(
+                    dirt_status=dirt_status)
+                evaluator = vacuum_world.CleanFloorEvaluator()
+                vacuum_world.run_experiment(
+                    environment, agent, evaluator, steps=50,
+                    early_termination=early_termination)
+                scores.append(evaluator.score)
+                decisions.append(logger.info.call_count)
+                logger.reset_mock()
+            assert scores[0] == scores[1]
+            if dirt_status[1] == 'f' or type(agent) is ReflexAgent:
+                assert decisions[1] < decisions[0]
+
+
+def test_fast_forward_matches_full_run(logger):
+    for dirt_status in (['t', 't'], ['t', 'f'], ['f', 't'], ['f', 'f']):
+        for agent in (vacuum_world.SuckyAgent(), ReflexAgent()):
+            for steps in (1, 2, 3, 1000, 1001):
+                scores = []
+                for fast_forward in (False, True):
+                    environment = vacuum_world.BasicVacuumWorld(
+                        dirt_status=dirt_status)
+                    evaluator = vacuum_world.CleanFloorEvaluator()
+                    vacuum_world.run_experiment(
+                        environment, agent, evaluator, steps=steps,
+                        log_decisions=False, fast_forward=fast_forward)
+                    scores.append(evaluator.score)
+                assert scores[0] == scores[1]
+
+
+def test_fast_forward_stops_simulating_once_the_run_cycles(logger):
+    vacuum_world.run_experiment(vacuum_world.BasicVacuumWorld(),
+                                ReflexAgent(),
+                                vacuum_world.CleanFloorEvaluator(),
+                                steps=10 ** 9, fast_forward=True)
+    assert logger.info.call_count < 10
+
+
+def test_fast_forward_needs_deterministic_agent(logger):
+    agent = Mock()
+    agent.decide.return_value = 'SUCK'
+    vacuum_world.run_experiment(vacuum_world.BasicVacuumWorld(), agent,
+                                vacuum_world.CleanFloorEvaluator(), steps=20,
+                                fast_forward=True)
+    assert agent.decide.call_count == 20
+
+
+def test_fast_forward_skips_environments_with_random_dirt(logger):
+    class CountingAgent(ReflexAgent):
+        decisions = 0
+
+        def decide(self, percept):
+            CountingAgent.decisions += 1
+            return ReflexAgent.decide(self, percept)
+
+    environment = vacuum_world.BasicVacuumWorld(dirt_rate=['0.1'])
+    vacuum_world.run_experiment(environment, CountingAgent(),
+                                vacuum_world.CleanFloorEvaluator(),
+                                steps=50, log_decisions=False,
+                                fast_forward=True)
+    assert CountingAgent.decisions == 50
+
+
+def test_initial_states_cover_basic_vacuum_world():
+    states = vacuum_world.BasicVacuumWorld.initial_states()
+    keys = {vacuum_world.BasicVacuumWorld(**args).state_key for args in states}
+    assert len(keys) == 8
+
+
+def test_evaluate_initial_states_matches_separate_runs(logger):
+    for agent_class in (vacuum_world.SuckyAgent, ReflexAgent):
+        for steps in (1, 5, 1000):
+            results = vacuum_world.evaluate_initial_states(
+                vacuum_world.BasicVacuumWorld, agent_class,
+                vacuum_world.CleanFloorEvaluator, steps=steps)
+            assert len(results) == 8
+            for environment_args, score in results:
+                environment = vacuum_world.BasicVacuumWorld(
+                    **environment_args)
+                evaluator = vacuum_world.CleanFloorEvaluator()
+                vacuum_world.run_experiment(environment, agent_class(),
+                                            evaluator, steps=steps,
+                                            log_decisions=False)
+                assert score == evaluator.score
+
+
+def test_evaluate_initial_states_shares_work(logger):
+    class CountingAgent(ReflexAgent):
+        decisions = 0
+
+        def decide(self, percept):
+            CountingAgent.decisions += 1
+            return ReflexAgent.decide(self, percept)
+
+    vacuum_world.evaluate_initial_states(vacuum_world.BasicVacuumWorld,
+                                         CountingAgent,
+                                         vacuum_world.CleanFloorEvaluator,
+                                         steps=1000)
+    assert CountingAgent.decisions < 50
+
+
+def test_evaluate_initial_states_runs_other_agents_in_full(logger):
+    agent = Mock()
+    agent.decide.return_value = 'SUCK'
+    vacuum_world.evaluate_initial_states(vacuum_world.BasicVacuumWorld,
+                                         Mock(return_value=agent),
+                                         vacuum_world.CleanFloorEvaluator,
+                                         steps=10)
+    assert agent.decide.call_count == 80
+
+
+def test_main_reports_every_initial_state(monkeypatch, logger):
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--agent',
+                                     'reflex_agent.ReflexAgent', '--steps',
+                                     '3', '--all-initial-states'])
+
+    vacuum_world.main()
+
+    messages = [call[0][0] for call in logger.info.call_args_list]
+    assert vacuum_world.MSG_INITIAL_STATE_SCORE.format(
+        'agent_location=A dirt_status=dirty,dirty', 1 + 1 + 2) in messages
+    scores = [score for _, score in vacuum_world.evaluate_initial_states(
+        vacuum_world.BasicVacuumWorld, ReflexAgent,
+        vacuum_world.CleanFloorEvaluator, steps=3)]
+    assert vacuum_world.MSG_INITIAL_STATES_MEAN.format(
+        8, sum(scores) / 8) in messages
+
+
+def test_early_termination_needs_environment_support(logger):
+    agent = Mock()
+    environment = Mock(spec=['update', 'state', 'observable_state'])
+    vacuum_world.run_experiment(environment, agent, Mock(), steps=20,
+                                early_termination=True)
+    assert agent.decide.call_count == 20
+
+
+def test_run_experiment_uses_step_api(floor_path, logger):
+    class CountingEvaluator(IncrementalCleanFloorEvaluator):
+        steps = 0
+
+        def update_step(self, step):
+            self.steps += 1
+            IncrementalCleanFloorEvaluator.update_step(self, step)
+
+    path = floor_path(['+.+\n', '+x+\n', '.++\n'])
+    evaluators = []
+    # Recording wraps the environment, which hides its step() method.
+    for record in (False, True):
+        environment = GridRoombaWorld(agent_location=['0', '0'],
+                                      floor_state_path=[path])
+        if record:
+            environment = RecordingEnvironment(environment, io.BytesIO())
+        evaluators.append(CountingEvaluator())
+        random.seed(4)
+        vacuum_world.run_experiment(environment, RandomReflexAgent(),
+                                    evaluators[-1], steps=100,
+                                    early_termination=True)
+    stepped, updated = evaluators
+    assert stepped.steps > 0 and updated.steps == 0
+    assert stepped.score == updated.score
+
+
 def test_run_experiment_handles_agent_exceptions(logger):
     agent = Mock()
     agent.decide.side_effect = Exception
@@ -131,12 +315,52 @@ def test_log_level(logger):
 def test_agent_decisions_logged(logger):
     agent = Mock()
     decisions = [Mock() for _ in range(1000)]
-    log_lines = [MSG_AGENT_DECISION.format(t, repr(decisions[t - 1]))
-                 for t in range(1, 1001)]
     agent.decide.side_effect = decisions
 
     vacuum_world.run_experiment(Mock(), agent, Mock())
-    _assert_call_args(log_lines, logger.info.call_args_list)
+    assert logger.info.call_args_list == [
+        ((MSG_AGENT_DECISION, t, decisions[t - 1]), {})
+        for t in range(1, 1001)]
+
+
+def test_agent_decisions_formatted_as_before():
+    record = logging.LogRecord(vacuum_world.LOGGER_NAME, logging.INFO, '', 0,
+                               MSG_AGENT_DECISION, (3, 'SUCK'), None)
+    assert record.getMessage() == "t=3\tAgent Decision: 'SUCK'"
+
+
+def test_decisions_not_logged_when_switched_off(logger):
+    vacuum_world.run_experiment(Mock(), Mock(), Mock(), log_decisions=False)
+    assert not logger.info.called
+
+
+def test_decisions_not_logged_when_logger_disabled(logger):
+    logger.isEnabledFor.return_value = False
+    vacuum_world.run_experiment(Mock(), Mock(), Mock())
+    assert not logger.info.called
+
+
+def test_main_switches_decision_log_off(monkeypatch, default_args):
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py',
+                                     '--decision-log', 'off'])
+    vacuum_world.main()
+    assert run_experiment.call_args[1]['log_decisions'] is False
+
+
+def test_main_logs_decisions_through_queue(monkeypatch, capsys):
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--steps', '3',
+                                     '--decision-log', 'queue'])
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+
+    vacuum_world.main()
+
+    assert root.handlers == handlers
+    output = capsys.readouterr().out
+    assert "t=3\tAgent Decision: 'SUCK'" in output
+    assert MSG_SCORE.format(3) in output
 
 
 def test_main_log_level(logger, default_args):
@@ -173,6 +397,93 @@ def test_main_sets_handler(monkeypatch, default_args):
     assert vacuum_world.MSG_HELLO in messages
 
 
+def test_main_passes_steps_and_early_termination(monkeypatch, default_args):
+    run_experiment = Mock()
+    argv = ['vacuum_world.py', '--steps', '10', '--early-termination']
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', argv)
+    vacuum_world.main()
+    assert run_experiment.call_args[1] == {'steps': 10,
+                                           'early_termination': True,
+                                           'log_decisions': True,
+                                           'profiler': None,
+                                           'fast_forward': False}
+
+
+def test_main_records_trajectory(monkeypatch, logger, tmp_path):
+    path = tmp_path / "runs"
+    argv = ['vacuum_world.py', '--steps', '5', '--record-trajectory',
+            str(path)]
+    monkeypatch.setattr('sys.argv', argv)
+
+    vacuum_world.main()
+    vacuum_world.main()
+
+    with open(str(path), 'rb') as file:
+        trajectories = read_trajectories(file)
+    assert [len(t) for t in trajectories] == [5, 5]
+
+
+def test_main_refuses_to_record_dirt_that_comes_back(monkeypatch, logger,
+                                                     tmp_path):
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--env-dirt-rate',
+                                     '0.5', '--record-trajectory',
+                                     str(tmp_path / "run")])
+
+    assert vacuum_world.main() == 1
+
+    assert not run_experiment.called
+    message = logger.error.call_args[0][0]
+    assert message.startswith(vacuum_world.MSG_RECORDING_ERROR.format(''))
+
+
+def test_main_trajectories_replay_to_the_logged_score(monkeypatch, logger,
+                                                     tmp_path):
+    path = tmp_path / "run"
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--agent',
+                                     'reflex_agent.ReflexAgent', '--steps',
+                                     '50', '--record-trajectory', str(path)])
+
+    vacuum_world.main()
+
+    with open(str(path), 'rb') as file:
+        trajectory, = read_trajectories(file)
+    evaluator = vacuum_world.CleanFloorEvaluator()
+    replay(trajectory, vacuum_world.BasicVacuumWorld(), evaluator)
+    messages = [call[0][0] for call in logger.info.call_args_list]
+    assert MSG_SCORE.format(evaluator.score) in messages
+
+
+def test_run_experiment_profiles_each_phase(logger):
+    profiler = PhaseProfiler()
+    environment = vacuum_world.BasicVacuumWorld()
+    evaluator = vacuum_world.CleanFloorEvaluator()
+    vacuum_world.run_experiment(environment, ReflexAgent(), evaluator,
+                                steps=20, profiler=profiler)
+
+    summary = {(row["phase"], row["component"]): row
+               for row in profiler.summary()}
+    assert set(summary) == {('observable_state', 'BasicVacuumWorld'),
+                            ('decide', 'ReflexAgent'),
+                            ('update', 'BasicVacuumWorld'),
+                            ('state', 'BasicVacuumWorld'),
+                            ('evaluate', 'CleanFloorEvaluator')}
+    assert all(row["calls"] == 20 for row in summary.values())
+    assert sum(row["share"] for row in summary.values()) == pytest.approx(1)
+    assert evaluator.score == 38
+
+
+def test_main_prints_profile(monkeypatch, logger, default_args):
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--profile'])
+    vacuum_world.main()
+    profiler = vacuum_world.run_experiment.call_args[1]['profiler']
+    messages = [call[0][0] for call in logger.info.call_args_list]
+    assert isinstance(profiler, PhaseProfiler)
+    assert profiling.MSG_PROFILE_HEADER in messages
+
+
 def test_main_reports_score(monkeypatch, logger, default_args):
     for score in (0, 1, 10):
         evaluator = Mock()
@@ -234,6 +545,90 @@ def test_main_accepts_with_multiple_env_args(monkeypatch):
     assert environment.call_args[1] == {'a': ['a-val'], 'b': ['b-val']}
 
 
+def test_main_passes_agent_prefixes_to_agent_init(monkeypatch):
+    argv = ['vacuum_world.py', '--env-a', 'a-val', '--agent-b', 'b-val',
+            'b-val2', '--agent-c', '--env-d']
+    environment = Mock()
+    agent = Mock()
+    monkeypatch.setattr('vacuum_world.CleanFloorEvaluator', Mock())
+    monkeypatch.setattr('vacuum_world.BasicVacuumWorld', environment)
+    monkeypatch.setattr('vacuum_world.SuckyAgent', agent)
+    monkeypatch.setattr('sys.argv', argv)
+
+    vacuum_world.main()
+
+    assert environment.call_args[1] == {'a': ['a-val'], 'd': []}
+    assert agent.call_args[1] == {'b': ['b-val', 'b-val2'], 'c': []}
+
+
+def test_main_handles_bad_agent_args(monkeypatch, logger):
+    argv = ['vacuum_world.py', '--agent-a', 'a-val']
+    agent = Mock(side_effect=ValueError(['a-val']))
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.SuckyAgent', agent)
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', argv)
+
+    vacuum_world.main()
+
+    messages = [call[0][0] for call in logger.error.call_args_list]
+    assert vacuum_world.MSG_AGENT_INIT_ERROR.format(['a-val']) in messages
+    assert not run_experiment.called
+
+
+def test_main_reports_missing_agent_args(monkeypatch, logger):
+    argv = ['vacuum_world.py', '--agent', 'planner_agent.CoveragePlannerAgent']
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', argv)
+
+    assert vacuum_world.main() == 1
+
+    (message,) = [call[0][0] for call in logger.error.call_args_list]
+    assert message.startswith(vacuum_world.MSG_AGENT_INIT_ERROR.format(''))
+    assert not run_experiment.called
+
+
+def test_main_trials_report_bad_agent_args(monkeypatch, logger):
+    argv = ['vacuum_world.py', '--trials', '2', '--agent',
+            'planner_agent.CoveragePlannerAgent',
+            '--agent-floor-state-path', 'a', 'b']
+    run_trials = Mock()
+    monkeypatch.setattr('vacuum_world.run_trials', run_trials)
+    monkeypatch.setattr('sys.argv', argv)
+
+    assert vacuum_world.main() == 1
+
+    (message,) = [call[0][0] for call in logger.error.call_args_list]
+    assert message.startswith(vacuum_world.MSG_AGENT_INIT_ERROR.format(''))
+    assert not run_trials.called
+
+
+def test_main_memoizes_agent_decisions(monkeypatch, logger):
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--memoize',
+                                     '--agent', 'reflex_agent.ReflexAgent'])
+
+    vacuum_world.main()
+
+    agent = run_experiment.call_args[0][1]
+    assert isinstance(agent, MemoizingAgent)
+    assert agent.decide({"agent_location": 'A', "is_dirty": False}) == \
+        'RIGHT'
+
+
+def test_main_memoizes_only_deterministic_agents(monkeypatch, logger):
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--memoize',
+                                     '--agent',
+                                     'roomba_world.RandomReflexAgent'])
+
+    assert vacuum_world.main() == 1
+    assert not run_experiment.called
+
+
 def test_main_rejects_non_env_custom_arg(monkeypatch):
     argv = ['vacuum_world.py', 'foobar']
     environment = Mock()
@@ -398,6 +793,152 @@ def test_main_catches_environment_exceptions(monkeypatch, default_args, logger):
     assert error_message in messages
 
 
+def test_run_trials_builds_fresh_actors_per_trial(monkeypatch):
+    run_experiment = Mock()
+    environment_class = Mock()
+    agent_class = Mock()
+    evaluator_class = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+
+    scores = vacuum_world.run_trials(environment_class, agent_class,
+                                     evaluator_class, {'a': ['b']},
+                                     trials=5, workers=1)
+
+    assert len(scores) == 5
+    assert run_experiment.call_count == 5
+    assert environment_class.call_count == 5
+    assert environment_class.call_args == ((), {'a': ['b']})
+    assert agent_class.call_count == 5
+    assert evaluator_class.call_count == 5
+
+
+def test_run_trials_derives_distinct_reproducible_seeds(monkeypatch):
+    seeds = []
+    monkeypatch.setattr('vacuum_world.run_experiment', Mock())
+    monkeypatch.setattr('random.seed', seeds.append)
+
+    vacuum_world.run_trials(Mock(), Mock(), Mock(), {}, trials=3, workers=1,
+                            seed=42)
+    vacuum_world.run_trials(Mock(), Mock(), Mock(), {}, trials=3, workers=1,
+                            seed=42)
+
+    assert len(set(seeds[:3])) == 3
+    assert seeds[:3] == seeds[3:]
+
+
+def test_run_trials_derives_agent_seeds_per_trial(monkeypatch):
+    monkeypatch.setattr('vacuum_world.run_experiment', Mock())
+    agent_class = Mock()
+
+    vacuum_world.run_trials(Mock(), agent_class, Mock(), {}, trials=3,
+                            workers=1, agent_args={'seed': ['5']})
+    vacuum_world.run_trials(Mock(), agent_class, Mock(), {}, trials=3,
+                            workers=1, agent_args={'seed': ['5']})
+
+    seeds = [call[1]['seed'] for call in agent_class.call_args_list]
+    assert len(set(map(tuple, seeds[:3]))) == 3
+    assert seeds[:3] == seeds[3:]
+
+
+def test_run_trials_in_process_restores_random_state(monkeypatch):
+    monkeypatch.setattr('vacuum_world.run_experiment', Mock())
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+
+    vacuum_world.run_trials(Mock(), Mock(), Mock(), {}, trials=2, workers=1,
+                            seed=42)
+
+    assert random.random() == expected
+
+
+@pytest.mark.parametrize('argv', [['--workers', '2'], ['--seed', '1'],
+                                  ['--trials', '--profile'],
+                                  ['--trials', '--record-trajectory', 'x'],
+                                  ['--early-termination',
+                                   '--record-trajectory', 'x'],
+                                  ['--fast-forward',
+                                   '--record-trajectory', 'x']])
+def test_main_rejects_options_that_would_be_ignored(monkeypatch, argv):
+    run_experiment = Mock()
+    monkeypatch.setattr('vacuum_world.run_experiment', run_experiment)
+    monkeypatch.setattr('vacuum_world.run_trials', Mock())
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py'] + argv)
+
+    with pytest.raises(SystemExit):
+        vacuum_world.main()
+
+    assert not run_experiment.called
+    assert not vacuum_world.run_trials.called
+
+
+def test_run_trials_in_worker_processes():
+    scores = vacuum_world.run_trials(vacuum_world.BasicVacuumWorld,
+                                     vacuum_world.SuckyAgent,
+                                     vacuum_world.CleanFloorEvaluator,
+                                     {'dirt_status': ['t', 'f']},
+                                     trials=4, workers=2)
+    assert scores == [2000] * 4
+
+
+def test_run_trials_shares_maps_with_worker_processes(tmp_path):
+    path = tmp_path / "floor"
+    path.write_text("++\n++\n")
+    scores = vacuum_world.run_trials(GridRoombaWorld, vacuum_world.SuckyAgent,
+                                     IncrementalCleanFloorEvaluator,
+                                     {'agent_location': ['0', '0'],
+                                      'floor_state_path': [str(path)]},
+                                     trials=4, workers=2, steps=10)
+    assert scores == [10] * 4
+
+
+def test_summarize_scores():
+    summary = vacuum_world.summarize_scores([4, 1, 3, 2, 5])
+    assert summary["trials"] == 5
+    assert summary["mean"] == 3
+    assert summary["min"] == 1
+    assert summary["max"] == 5
+    assert summary["stdev"] == pytest.approx(1.5811, abs=1e-4)
+    assert summary["percentiles"][50] == 3
+    assert summary["percentiles"][25] == 2
+
+
+def test_summarize_single_score():
+    summary = vacuum_world.summarize_scores([7])
+    assert summary["stdev"] == 0
+    assert set(summary["percentiles"].values()) == {7}
+
+
+def test_main_runs_trials(monkeypatch, logger):
+    run_trials = Mock(return_value=[1, 2, 3])
+    argv = ['vacuum_world.py', '--trials', '3', '--workers', '2',
+            '--seed', '9']
+    monkeypatch.setattr('sys.argv', argv)
+    monkeypatch.setattr('vacuum_world.run_trials', run_trials)
+    monkeypatch.setattr('vacuum_world.run_experiment', Mock())
+
+    vacuum_world.main()
+
+    assert run_trials.call_args[1] == {'trials': 3, 'workers': 2, 'seed': 9,
+                                       'steps': vacuum_world.NUM_STEPS,
+                                       'early_termination': False,
+                                       'agent_args': {}, 'memoize': False,
+                                       'fast_forward': False}
+    assert not vacuum_world.run_experiment.called
+    messages = [call[0][0] for call in logger.info.call_args_list]
+    assert vacuum_world.MSG_TRIAL_SCORES.format(3, 2, 1, 1, 3) in messages
+
+
+def test_main_trials_default_to_num_trials(monkeypatch, logger):
+    run_trials = Mock(return_value=[0])
+    monkeypatch.setattr('sys.argv', ['vacuum_world.py', '--trials'])
+    monkeypatch.setattr('vacuum_world.run_trials', run_trials)
+
+    vacuum_world.main()
+
+    assert run_trials.call_args[1]['trials'] == vacuum_world.NUM_TRIALS
+
+
 def _assert_call_args(values, call_args_list):
     """
     Assert that each value is the sole argument to its counterpart in
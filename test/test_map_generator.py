@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from map_generator import *
+from roomba_world import GridRoombaWorld, RoombaWorld
+
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'example')
+
+
+def _rows(path):
+    with open(path) as floor:
+        return floor.read().split('\n')[:-1]
+
+
+@pytest.mark.parametrize('pattern, height, width', [('donut', 7, 9),
+                                                    ('hourglass', 7, 7)])
+def test_patterns_reproduce_example_maps(tmp_path, pattern, height, width):
+    path = str(tmp_path / pattern)
+    generate_map(path, height, width, dirt_density=1, pattern=pattern)
+    assert _rows(path) == _rows(os.path.join(EXAMPLE_DIR,
+                                             pattern + '_world'))
+
+
+def test_generated_maps_load(tmp_path):
+    path = str(tmp_path / 'floor')
+    start = generate_map(path, 30, 40, dirt_density=0.3,
+                         obstacle_density=0.2, pattern='donut', seed=1)
+    rows = _rows(path)
+    assert len(rows) == 30
+    assert all(len(row) == 40 and set(row) <= set('.+x') for row in rows)
+    assert rows[start[0]][start[1]] != 'x'
+    for environment_class in (RoombaWorld, GridRoombaWorld):
+        environment = environment_class(
+            agent_location=[str(x) for x in start], floor_state_path=[path])
+        assert len(environment.state.floor_status) == 30 * 40
+
+
+def test_densities(tmp_path):
+    path = str(tmp_path / 'floor')
+    generate_map(path, 100, 100, dirt_density=0.5, obstacle_density=0.25,
+                 seed=2)
+    cells = ''.join(_rows(path))
+    assert cells.count('x') == pytest.approx(2500, rel=0.1)
+    assert cells.count('+') == pytest.approx(3750, rel=0.1)
+
+    generate_map(path, 10, 10, dirt_density=0, seed=2)
+    assert set(''.join(_rows(path))) == {'.'}
+
+
+def test_seeded_layouts_repeat(tmp_path):
+    layouts = []
+    for seed in (3, 3, 4):
+        path = str(tmp_path / str(len(layouts)))
+        generate_map(path, 20, 20, obstacle_density=0.3, seed=seed)
+        layouts.append(_rows(path))
+    assert layouts[0] == layouts[1]
+    assert layouts[0] != layouts[2]
+
+
+def test_reports_maps_without_passable_locations(tmp_path):
+    path = str(tmp_path / 'floor')
+    assert generate_map(path, 3, 3, obstacle_density=1) is None
+
+
+@pytest.mark.parametrize('args', [{'height': 0}, {'width': -1},
+                                  {'dirt_density': 1.5},
+                                  {'obstacle_density': -0.1},
+                                  {'pattern': 'spiral'}])
+def test_rejects_bad_arguments(tmp_path, args):
+    kwargs = dict(path=str(tmp_path / 'floor'), height=5, width=5)
+    kwargs.update(args)
+    with pytest.raises(ValueError):
+        generate_map(**kwargs)
+
+
+def test_main_writes_map(tmp_path, capsys):
+    path = str(tmp_path / 'floor')
+    main([path, '--height', '4', '--width', '6', '--dirt', '1',
+          '--pattern', 'hourglass', '--seed', '5'])
+    assert _rows(path)[0] == '+xxxxx'
+    assert capsys.readouterr().out == MSG_GENERATED.format(4, 6, path,
+                                                           '0 0') + '\n'
@@ -0,0 +1,75 @@
+from unittest.mock import Mock
+
+import pytest
+
+from memoizing_agent import *
+from reflex_agent import ReflexAgent
+from roomba_world import RandomReflexAgent, RoombaWorld
+from vacuum_world import BasicVacuumWorld, CleanFloorEvaluator, run_experiment
+
+
+class CountingAgent(object):
+    deterministic = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def decide(self, percept):
+        self.calls += 1
+        return 'SUCK' if percept.is_dirty else 'UP'
+
+
+def _percept(x, is_dirty=False):
+    return RoombaWorld.ObservableState(agent_location=(x, 0),
+                                       is_dirty=is_dirty)
+
+
+def test_decides_each_percept_once():
+    agent = CountingAgent()
+    memoizing = MemoizingAgent(agent)
+    decisions = [memoizing.decide(_percept(0, is_dirty))
+                 for is_dirty in (True, False, True, False)]
+    assert decisions == ['SUCK', 'UP', 'SUCK', 'UP']
+    assert agent.calls == 2
+
+
+def test_forgets_least_recently_used_percepts():
+    agent = CountingAgent()
+    memoizing = MemoizingAgent(agent, size=2)
+    for x in (0, 1, 0, 2, 0, 1):
+        memoizing.decide(_percept(x))
+    assert agent.calls == 4
+
+
+def test_memoizes_dictionary_percepts():
+    memoizing = MemoizingAgent(ReflexAgent())
+    percept = {"agent_location": 'B', "is_dirty": False}
+    assert memoizing.decide(percept) == 'LEFT'
+    assert memoizing.decide(dict(percept)) == 'LEFT'
+    with pytest.raises(ValueError):
+        memoizing.decide({"agent_location": 'C', "is_dirty": False})
+
+
+def test_rejects_agents_not_declared_deterministic():
+    for agent in (RandomReflexAgent(), Mock()):
+        with pytest.raises(ValueError):
+            MemoizingAgent(agent)
+
+
+def test_memoized_runs_fast_forward():
+    class CountingEvaluator(CleanFloorEvaluator):
+        updates = 0
+
+        def update(self, state):
+            CountingEvaluator.updates += 1
+            CleanFloorEvaluator.update(self, state)
+
+    scores = []
+    for fast_forward in (False, True):
+        evaluator = CountingEvaluator()
+        run_experiment(BasicVacuumWorld(), MemoizingAgent(ReflexAgent()),
+                       evaluator, steps=1000, log_decisions=False,
+                       fast_forward=fast_forward)
+        scores.append(evaluator.score)
+    assert scores[0] == scores[1]
+    assert CountingEvaluator.updates < 1000 + 10
@@ -0,0 +1,82 @@
+import os
+import random
+
+import pytest
+
+from planner_agent import *
+from roomba_world import (GridRoombaWorld, IncrementalCleanFloorEvaluator,
+                          RandomReflexAgent)
+from vacuum_world import run_experiment
+
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'example')
+
+
+def _run(agent, path, start, steps=200):
+    environment = GridRoombaWorld(agent_location=[str(x) for x in start],
+                                  floor_state_path=[path])
+    evaluator = IncrementalCleanFloorEvaluator()
+    run_experiment(environment, agent, evaluator, steps=steps,
+                   log_decisions=False)
+    return environment, evaluator
+
+
+@pytest.mark.parametrize('map_name', ['donut_world', 'hourglass_world',
+                                      'linear_world'])
+def test_cleans_example_maps(map_name):
+    path = os.path.join(EXAMPLE_DIR, map_name)
+    start = _first_passable(path)
+    plan = plan_coverage(path, start)
+    agent = CoveragePlannerAgent(floor_state_path=[path])
+    environment, _ = _run(agent, path, start, steps=len(plan))
+    assert environment.is_quiescent
+
+
+def test_beats_random_agent():
+    path = os.path.join(EXAMPLE_DIR, 'hourglass_world')
+    random.seed(0)
+    agent = CoveragePlannerAgent(floor_state_path=[path])
+    _, planned = _run(agent, path, (3, 3))
+    _, wandered = _run(RandomReflexAgent(), path, (3, 3))
+    assert planned.score > wandered.score
+
+
+def test_takes_shortest_route_to_nearest_dirt(floor_path):
+    path = floor_path(['+..\n', 'x.+\n'])
+    actions = [ACTIONS[code] for code in plan_coverage(path, (0, 1))]
+    assert actions == ['LEFT', 'SUCK', 'RIGHT', 'DOWN', 'RIGHT', 'SUCK']
+
+
+def test_skips_unreachable_dirt_and_then_stays_put(floor_path):
+    path = floor_path(['+x+\n'])
+    agent = CoveragePlannerAgent(floor_state_path=[path])
+    environment = GridRoombaWorld(agent_location=['0', '0'],
+                                  floor_state_path=[path])
+    percept = environment.observable_state
+    assert [agent.decide(percept) for _ in range(3)] == ['SUCK'] * 3
+
+
+def test_plans_are_cached_per_map_and_start(floor_path):
+    path = floor_path(['+.+\n'])
+    plan = plan_coverage(path, (0, 1))
+    assert plan_coverage(path, (0, 1)) is plan
+    assert plan_coverage(path, (0, 0)) is not plan
+
+    stat = os.stat(path)
+    floor_path(['...\n'])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert plan_coverage(path, (0, 1)) == b''
+
+
+def test_rejects_wrong_number_of_paths():
+    with pytest.raises(ValueError):
+        CoveragePlannerAgent(floor_state_path=[])
+
+
+def _first_passable(path):
+    with open(path) as floor:
+        for x, line in enumerate(floor):
+            for y, char in enumerate(line.rstrip()):
+                if char != 'x':
+                    return x, y
@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+
+import pytest
+
+from profiling import *
+from reflex_agent import ReflexAgent
+from roomba_world import (GridRoombaWorld, IncrementalCleanFloorEvaluator,
+                          RandomReflexAgent)
+from vacuum_world import BasicVacuumWorld, CleanFloorEvaluator, run_experiment
+
+
+class Component(object):
+    pass
+
+
+def test_percentiles_within_one_bucket():
+    profiler = PhaseProfiler()
+    for microseconds in range(1, 101):
+        profiler.record('decide', Component, microseconds / 1e6)
+    (row,) = profiler.summary()
+    assert row["calls"] == 100
+    assert row["total"] == pytest.approx(5050 / 1e6)
+    for p in PERCENTILES:
+        assert row["percentiles"][p] == pytest.approx(p / 1e6, rel=0.1)
+
+
+def test_instrumented_components_pass_through():
+    profiler = PhaseProfiler()
+    environment, agent, evaluator = profiler.instrument(Mock(), Mock(),
+                                                        Mock())
+    agent.decide(environment.observable_state)
+    environment.update('SUCK')
+    evaluator.update(environment.state)
+    assert environment.is_quiescent is environment._component.is_quiescent
+    assert evaluator.score is evaluator._component.score
+    assert len(profiler.summary()) == 5
+
+
+def test_wrappers_are_reported_as_the_wrapped_class():
+    class Floor(object):
+        state = None
+
+    class Wrapper(object):
+        def __init__(self, wrapped):
+            self._wrapped = wrapped
+
+        @property
+        def wrapped(self):
+            return self._wrapped
+
+        @property
+        def state(self):
+            return self._wrapped.state
+
+    profiler = PhaseProfiler()
+    environment, _, _ = profiler.instrument(Wrapper(Wrapper(Floor())),
+                                            Mock(), Mock())
+    environment.state
+    (row,) = profiler.summary()
+    assert row["component"] == 'Floor'
+
+
+def test_failed_calls_are_timed():
+    profiler = PhaseProfiler()
+    agent = Mock()
+    agent.decide.side_effect = ValueError
+    _, timed_agent, _ = profiler.instrument(Mock(), agent, Mock())
+    with pytest.raises(ValueError):
+        timed_agent.decide(None)
+    assert profiler.summary()[0]["calls"] == 1
+
+
+def test_report_has_row_per_phase_and_component():
+    profiler = PhaseProfiler()
+    profiler.record('decide', Component, 1e-6)
+    profiler.record('update', Component, 2e-6)
+    lines = profiler.report()
+    assert lines[0] == MSG_PROFILE_HEADER
+    assert len(lines) == 3
+    assert len(lines[1]) == len(lines[0])
+
+
+def test_profiled_runs_keep_the_step_api(floor_path):
+    path = floor_path(['+.+\n', '.x.\n'])
+    scores = []
+    for profiler in (None, PhaseProfiler()):
+        environment = GridRoombaWorld(agent_location=['0', '0'],
+                                      floor_state_path=[path])
+        evaluator = IncrementalCleanFloorEvaluator()
+        run_experiment(environment, RandomReflexAgent(seed=['1']),
+                       evaluator, steps=20, log_decisions=False,
+                       profiler=profiler)
+        scores.append(evaluator.score)
+    phases = {row["phase"] for row in profiler.summary()}
+    assert {'step', 'start', 'evaluate', 'decide'} <= phases
+    assert 'update' not in phases
+    assert scores[0] == scores[1]
+
+
+def test_profiled_runs_still_fast_forward():
+    profiler = PhaseProfiler()
+    evaluator = CleanFloorEvaluator()
+    run_experiment(BasicVacuumWorld(), ReflexAgent(), evaluator,
+                   steps=10 ** 6, log_decisions=False, profiler=profiler,
+                   fast_forward=True)
+    calls = {row["phase"]: row["calls"] for row in profiler.summary()}
+    assert calls['decide'] < 10
+    assert 'state_key' in calls
@@ -1,3 +1,4 @@
+import random
 from unittest.mock import MagicMock, Mock
 
 import pytest
@@ -204,6 +205,30 @@ class TestRoombaWorld(object):
         environment.update('SUCK')
         assert not environment.state.floor_status[(0, 0)].is_dirty
 
+    def test_counts_clean_locations(self, floor_file):
+        floor_file.readlines.return_value = ['+.\n', 'x+\n']
+        environment = RoombaWorld(agent_location=["0", "0"],
+                                  floor_state_path=["some/path"])
+        assert environment.state.clean_count == 2
+        environment.update('SUCK')
+        assert environment.state.clean_count == 3
+        environment.update('SUCK')
+        assert environment.state.clean_count == 3
+        environment.update('DOWN')
+        environment.update('RIGHT')
+        environment.update('SUCK')
+        assert environment.state.clean_count == 3
+
+    def test_quiescent_once_all_clean(self, floor_file):
+        floor_file.readlines.return_value = ['+x\n', '+.\n']
+        environment = RoombaWorld(agent_location=["0", "0"],
+                                  floor_state_path=["some/path"])
+        environment.update('SUCK')
+        assert not environment.is_quiescent
+        environment.update('DOWN')
+        environment.update('SUCK')
+        assert environment.is_quiescent
+
     def test_rejects_other_actions(self, floor_file):
         floor_file.readlines.return_value = ['+\n']
         environment = RoombaWorld(agent_location=["0", "0"],
@@ -212,6 +237,342 @@ class TestRoombaWorld(object):
             environment.update('NOPE')
 
 
+class TestGridRoombaWorld(object):
+    def test_floor_status_matches_dict_backend(self, floor_path):
+        path = floor_path(['+.x\n', '.+\n', '\n', 'x\n'])
+        grid_environment = GridRoombaWorld(agent_location=["0", "0"],
+                                           floor_state_path=[path])
+        dict_environment = RoombaWorld(agent_location=["0", "0"],
+                                       floor_state_path=[path])
+        assert dict(grid_environment.state.floor_status) == \
+            dict_environment.state.floor_status
+        assert len(grid_environment.state.floor_status) == 6
+        assert grid_environment.state.clean_count == 4
+
+    def test_rejects_other_characters_in_floor_state(self, floor_path):
+        for lines in (['.b'], ['.b\n', '..\n']):
+            path = floor_path(lines)
+            with pytest.raises(ValueError):
+                GridRoombaWorld(agent_location=["0", "0"],
+                                floor_state_path=[path])
+
+    def test_expects_passable_agent_start_in_bounds(self, floor_path):
+        path = floor_path(['.x\n', '.\n'])
+        for agent_start in (["0", "1"], ["1", "1"], ["2", "0"], ["0", "-1"]):
+            with pytest.raises(ValueError):
+                GridRoombaWorld(agent_location=agent_start,
+                                floor_state_path=[path])
+
+    def test_matches_dict_backend_step_by_step(self, floor_path):
+        path = floor_path(['+.+\n', '+x+\n', '.+\n'])
+        grid_environment = GridRoombaWorld(agent_location=["0", "0"],
+                                           floor_state_path=[path])
+        dict_environment = RoombaWorld(agent_location=["0", "0"],
+                                       floor_state_path=[path])
+        actions = ['SUCK', 'DOWN', 'RIGHT', 'SUCK', 'DOWN', 'RIGHT', 'RIGHT',
+                   'SUCK', 'UP', 'UP', 'SUCK', 'RIGHT', 'LEFT', 'SUCK']
+        for action in actions:
+            grid_environment.update(action)
+            dict_environment.update(action)
+            assert grid_environment.observable_state == \
+                dict_environment.observable_state
+            assert grid_environment.state.clean_count == \
+                dict_environment.state.clean_count
+        assert dict(grid_environment.state.floor_status) == \
+            dict_environment.state.floor_status
+
+    def test_moves_through_shared_neighbor_index(self, floor_path,
+                                                 monkeypatch):
+        floors = []
+        initialize = MoveTable.__init__
+
+        def record_floor(self, floor_status):
+            floors.append(floor_status)
+            initialize(self, floor_status)
+
+        monkeypatch.setattr(MoveTable, '__init__', record_floor)
+        path = floor_path(['..\n'])
+        environment = GridRoombaWorld(agent_location=['0', '0'],
+                                      floor_state_path=[path])
+        environment.update('RIGHT')
+        assert environment.observable_state.agent_location == (0, 1)
+        assert environment.neighbors is MAP_CACHE.neighbors(path)
+        # Only the NeighborIndex, which has no dict floor, was built.
+        assert floors == [None]
+
+    def test_worlds_on_same_map_are_independent(self, floor_path):
+        path = floor_path(['+\n'])
+        first = GridRoombaWorld(agent_location=["0", "0"],
+                                floor_state_path=[path])
+        first.update('SUCK')
+        second = GridRoombaWorld(agent_location=["0", "0"],
+                                 floor_state_path=[path])
+        assert not first.observable_state.is_dirty
+        assert second.observable_state.is_dirty
+        assert second.state.clean_count == 0
+
+    def test_rejects_other_actions(self, floor_path):
+        path = floor_path(['.\n'])
+        environment = GridRoombaWorld(agent_location=["0", "0"],
+                                      floor_state_path=[path])
+        with pytest.raises(ValueError):
+            environment.update('NOPE')
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_states_are_reused_until_they_change(world_class, floor_path):
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['+.\n'])])
+    state, percept = world.state, world.observable_state
+    world.update('UP')
+    assert world.state is state and world.observable_state is percept
+    world.update('SUCK')
+    assert world.state.clean_count == 2
+    assert not world.observable_state.is_dirty
+    state = world.state
+    world.update('RIGHT')
+    assert world.state is not state
+    assert world.observable_state.agent_location == (0, 1)
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_step_reports_percept_and_changes(world_class, floor_path):
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['+.\n'])])
+    assert world.step('SUCK') == RoombaWorld.Step(
+        percept=((0, 0), False), cleaned=1, moved=False)
+    assert world.step('UP') == RoombaWorld.Step(
+        percept=((0, 0), False), cleaned=0, moved=False)
+    assert world.step('RIGHT') == RoombaWorld.Step(
+        percept=((0, 1), False), cleaned=0, moved=True)
+    assert world.step('SUCK').cleaned == 0
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_dirt_index_follows_cleaning(world_class, floor_path):
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['+.x+\n',
+                                                      '..x.\n',
+                                                      '+...\n'])])
+    world.update('SUCK')
+    dirt = world.dirt
+    assert len(dirt) == 2
+    assert set(dirt) == {(0, 3), (2, 0)}
+    assert (0, 3) in dirt and (0, 0) not in dirt and (0, 2) not in dirt
+    assert dirt.nearest((0, 1)) == ((2, 0), 3)
+    assert dirt.nearest((1, 3)) == ((0, 3), 1)
+    assert dirt.nearest((0, 2)) is None
+
+    world.update('DOWN')
+    world.update('DOWN')
+    world.update('SUCK')
+    assert world.dirt is dirt
+    assert set(dirt) == {(0, 3)}
+    assert dirt.nearest((2, 0)) == ((0, 3), 5)
+    assert not dirt.is_clean
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_dirt_index_on_clean_floor(world_class, floor_path):
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['+.\n'])])
+    world.update('SUCK')
+    assert world.dirt.is_clean
+    assert len(world.dirt) == 0
+    assert world.dirt.nearest((0, 1)) is None
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_dirt_comes_back_at_its_rate(world_class, floor_path):
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['..x\n'])],
+                        dirt_rate=['1'])
+    dirt = world.dirt
+    assert not world.is_quiescent
+    step = world.step('RIGHT')
+    assert step.cleaned == -2
+    assert step.percept.is_dirty
+    assert world.state.clean_count == 1
+    assert set(dirt) == {(0, 0), (0, 1)}
+    step = world.step('SUCK')
+    assert step.cleaned == 0
+    assert step.percept.is_dirty
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_dirt_rates_are_weighted_per_location(world_class, floor_path):
+    weights = floor_path(['90\n', '0\n'], name='weights')
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['..\n', '.\n'])],
+                        dirt_rate=['1'], dirt_rate_path=[weights])
+    for action in ('DOWN', 'UP', 'RIGHT'):
+        world.update(action)
+    assert [world.state.floor_status[location].is_dirty
+            for location in ((0, 0), (0, 1), (1, 0))] == [True, False, False]
+
+
+@pytest.mark.parametrize('world_class', [RoombaWorld, GridRoombaWorld])
+def test_evaluators_agree_while_dirt_comes_back(world_class, floor_path):
+    random.seed(3)
+    world = world_class(agent_location=['0', '0'],
+                        floor_state_path=[floor_path(['+.+\n', '.x.\n'])],
+                        dirt_rate=['0.2'])
+    reference = CleanFloorEvaluator()
+    incremental = IncrementalCleanFloorEvaluator()
+    incremental.start(world.state)
+    agent = RandomReflexAgent()
+    for _ in range(200):
+        incremental.update_step(world.step(agent.decide(
+            world.observable_state)))
+        reference.update(world.state)
+    assert incremental.score == reference.score
+    assert len(world.dirt) == len(world.state.floor_status) - \
+        world.state.clean_count
+
+
+@pytest.mark.parametrize('args', [{'dirt_rate': ['2']},
+                                  {'dirt_rate': ['0.1', '0.2']},
+                                  {'dirt_rate_path': ['weights']}])
+def test_rejects_bad_dirt_rates(args, floor_path):
+    with pytest.raises(ValueError):
+        RoombaWorld(agent_location=['0', '0'],
+                    floor_state_path=[floor_path(['.\n'])], **args)
+
+
+class TestFloorGrid(object):
+    def test_stores_one_byte_per_cell(self):
+        grid = FloorGrid.from_lines(['+.\n', 'x\n'])
+        assert grid.cells == bytearray((CELL_DIRTY, CELL_CLEAN,
+                                        CELL_OBSTACLE, CELL_VOID))
+        assert (grid.width, grid.height) == (2, 2)
+
+    def test_short_rows_are_not_part_of_the_floor(self):
+        grid = FloorGrid.from_lines(['..\n', '.\n'])
+        assert (1, 1) not in grid
+        assert sorted(grid) == [(0, 0), (0, 1), (1, 0)]
+        with pytest.raises(KeyError):
+            grid[(1, 1)]
+
+    def test_loads_file_in_bulk(self, floor_path):
+        lines = ['+.x\n', '.+.\n', 'xx+']
+        grid = FloorGrid.from_path(floor_path(lines))
+        assert grid.cells == FloorGrid.from_lines(lines).cells
+        assert grid.width == 3
+
+    def test_loads_file_in_chunks(self, floor_path, monkeypatch):
+        monkeypatch.setattr('roomba_world.PARSE_CHUNK_SIZE', 4)
+        lines = ['+.x.+\n', '.+..x\n', 'xx+..\n']
+        grid = FloorGrid.from_path(floor_path(lines))
+        assert grid.cells == FloorGrid.from_lines(lines).cells
+        with pytest.raises(ValueError):
+            FloorGrid.from_path(floor_path(lines + ['..?..\n']))
+
+    def test_loads_irregular_file(self, floor_path):
+        for lines in (['+.\n', '.\n'], ['..\r\n', '+.\r\n'], ['.\n', '\n'],
+                      []):
+            grid = FloorGrid.from_path(floor_path(lines))
+            expected = FloorGrid.from_lines(lines)
+            assert grid.cells == expected.cells
+            assert grid.width == expected.width
+
+    def test_locations_write_through_to_cells(self):
+        grid = FloorGrid.from_lines(['+\n'])
+        grid[(0, 0)].is_dirty = False
+        assert grid.cells[0] == CELL_CLEAN
+        assert grid[(0, 0)] == Location(is_dirty=False)
+
+
+class TestMapCache(object):
+    def test_parses_each_map_once(self, floor_path, monkeypatch):
+        path = floor_path(['+.\n', '.+\n'])
+        from_path = Mock(wraps=FloorGrid.from_path)
+        monkeypatch.setattr('roomba_world.FloorGrid.from_path', from_path)
+        cache = MapCache()
+        first = cache.load(path)
+        second = cache.load(path)
+        assert from_path.call_count == 1
+        assert first.cells is second.cells
+
+    def test_reparses_modified_map(self, floor_path):
+        cache = MapCache()
+        path = floor_path(['+.\n'])
+        assert cache.load(path).count_clean() == 1
+        floor_path(['+..\n'])
+        assert cache.load(path).count_clean() == 2
+
+    def test_keeps_most_recently_used_maps(self, floor_path, monkeypatch):
+        cache = MapCache(size=2)
+        paths = [floor_path(['.\n'], name=name) for name in 'abc']
+        for path in paths[:2]:
+            cache.load(path)
+        cache.load(paths[0])
+        cache.load(paths[2])
+        from_path = Mock(wraps=FloorGrid.from_path)
+        monkeypatch.setattr('roomba_world.FloorGrid.from_path', from_path)
+        cache.load(paths[0])
+        cache.load(paths[2])
+        assert not from_path.called
+        cache.load(paths[1])
+        assert from_path.call_count == 1
+
+    def test_grids_copy_cells_on_first_write(self, floor_path):
+        cache = MapCache()
+        path = floor_path(['++\n'])
+        first = cache.load(path)
+        second = cache.load(path)
+        first[(0, 0)].is_dirty = False
+        assert first.count_clean() == 1
+        assert second.count_clean() == 0
+        assert second[(0, 0)].is_dirty
+        assert cache.load(path)[(0, 0)].is_dirty
+
+    def test_attaches_to_shared_maps(self, floor_path, monkeypatch):
+        path = floor_path(['+.x\n'])
+        with MAP_CACHE.shared([path]) as shared_maps:
+            cache = MapCache()
+            from_path = Mock()
+            monkeypatch.setattr('roomba_world.FloorGrid.from_path', from_path)
+            cache.attach(shared_maps)
+            grid = cache.load(path)
+            assert bytes(grid.cells) == bytes((CELL_DIRTY, CELL_CLEAN,
+                                               CELL_OBSTACLE))
+            grid.set_cell(0, CELL_CLEAN)
+            assert grid.count_clean() == 3
+            assert not from_path.called
+            cache.detach()
+
+
+class TestNeighborIndex(object):
+    CELLS = FloorGrid.from_lines(['..x\n', '.x.\n', '...\n']).cells
+
+    def test_moves_stay_on_the_floor(self):
+        neighbors = NeighborIndex(self.CELLS, 3)
+        assert neighbors.targets(0) == (0, 3, 0, 1)
+        assert neighbors.targets(1) == (1, 1, 0, 1)
+        assert neighbors.target(5, 'DOWN') == 8
+        with pytest.raises(ValueError):
+            neighbors.target(0, 'SUCK')
+
+    def test_distances(self):
+        distances = NeighborIndex(self.CELLS, 3).distances(0)
+        assert list(distances) == [0, 1, -1, 1, -1, 5, 2, 3, 4]
+
+    def test_route(self):
+        neighbors = NeighborIndex(self.CELLS, 3)
+        assert neighbors.route(1, 5) == ['LEFT', 'DOWN', 'DOWN', 'RIGHT',
+                                         'RIGHT', 'UP']
+        assert neighbors.route(0, 0) == []
+        assert neighbors.route(0, 2) is None
+
+    def test_cached_per_map(self, floor_path):
+        cache = MapCache()
+        path = floor_path(['..\n'])
+        neighbors = cache.neighbors(path)
+        assert cache.neighbors(path) is neighbors
+        floor_path(['.x\n'])
+        assert cache.neighbors(path).targets(0) == (0, 0, 0, 0)
+
+
 class TestLocation(object):
     def test_expects_is_dirty_as_boolean(self):
         Location(is_dirty=True)
@@ -237,6 +598,9 @@ class TestLocation(object):
         location = Location(is_dirty=False)
         assert location.is_passable
 
+    def test_has_no_instance_dict(self):
+        assert not hasattr(Location(is_dirty=False), '__dict__')
+
     def test_equals_checks_is_dirty(self):
         assert Location(is_dirty=False) == Location(is_dirty=False)
         assert Location(is_dirty=True) != Location(is_dirty=False)
@@ -266,6 +630,14 @@ class TestObstacle(object):
         obstacle = Obstacle()
         assert not obstacle.is_passable
 
+    def test_floors_share_one_immutable_obstacle(self, floor_path):
+        world = RoombaWorld(agent_location=['0', '0'],
+                            floor_state_path=[floor_path(['.xx\n'])])
+        floor_status = world.state.floor_status
+        assert floor_status[(0, 1)] is floor_status[(0, 2)] is OBSTACLE
+        with pytest.raises(AttributeError):
+            OBSTACLE.is_dirty = True
+
     def test_equals_checks_is_dirty(self):
         other = namedtuple('Tmp', ['is_dirty', 'is_passable'])
         obstacle = Obstacle()
@@ -334,6 +706,54 @@ class TestCleanFloorEvaluator(object):
         assert evaluator.score == 2
 
 
+class TestIncrementalCleanFloorEvaluator(object):
+    def test_scores_clean_count(self):
+        state = RoombaWorld.State(agent_location=(0, 0),
+                                  floor_status={},
+                                  clean_count=3)
+        evaluator = IncrementalCleanFloorEvaluator()
+        evaluator.update(state)
+        evaluator.update(state)
+        assert evaluator.score == 6
+
+    def test_falls_back_to_full_scan_without_clean_count(self):
+        floor_status = {
+            (0, 0): Location(True),
+            (0, 1): Location(False)
+        }
+        state = RoombaWorld.State(agent_location=(0, 0),
+                                  floor_status=floor_status)
+        evaluator = IncrementalCleanFloorEvaluator()
+        evaluator.update(state)
+        assert evaluator.score == 1
+
+    def test_matches_full_scan_evaluator(self, floor_file):
+        floor_file.readlines.return_value = ['+.+\n', '+x+\n', '.++\n']
+        environment = RoombaWorld(agent_location=["0", "0"],
+                                  floor_state_path=["some/path"])
+        reference = CleanFloorEvaluator()
+        incremental = IncrementalCleanFloorEvaluator()
+        actions = ['SUCK', 'RIGHT', 'SUCK', 'RIGHT', 'SUCK', 'DOWN', 'SUCK',
+                   'DOWN', 'SUCK', 'LEFT', 'SUCK', 'LEFT', 'SUCK', 'UP']
+        for action in actions:
+            environment.update(action)
+            reference.update(environment.state)
+            incremental.update(environment.state)
+            assert incremental.score == reference.score
+
+    def test_scores_steps_from_initial_state(self, floor_path):
+        environment = GridRoombaWorld(
+            agent_location=['0', '0'],
+            floor_state_path=[floor_path(['+.+\n', '+x+\n'])])
+        reference = CleanFloorEvaluator()
+        incremental = IncrementalCleanFloorEvaluator()
+        incremental.start(environment.state)
+        for action in ('SUCK', 'RIGHT', 'SUCK', 'RIGHT', 'SUCK', 'DOWN'):
+            incremental.update_step(environment.step(action))
+            reference.update(environment.state)
+        assert incremental.score == reference.score
+
+
 class TestRandomReflexAgent(object):
     @pytest.fixture
     def canned_rand(self, monkeypatch):
@@ -357,3 +777,31 @@ class TestRandomReflexAgent(object):
         assert agent.decide(state) == 'DOWN'
         assert agent.decide(state) == 'LEFT'
         assert agent.decide(state) == 'RIGHT'
+
+    def test_seeded_agents_repeat_their_moves(self):
+        state = RoombaWorld.ObservableState(agent_location=(2, 2),
+                                            is_dirty=False)
+        for block_size in (None, ['7']):
+            runs = [[agent.decide(state) for _ in range(50)] for agent in
+                    (RandomReflexAgent(seed=[seed], block_size=block_size)
+                     for seed in ('1', '1', '2'))]
+            assert runs[0] == runs[1]
+            assert runs[0] != runs[2]
+            assert set(runs[0]) == set(MOVES)
+
+    def test_draws_moves_in_blocks(self, monkeypatch):
+        randbytes = Mock(return_value=bytes(range(6)))
+        monkeypatch.setattr('random.randbytes', randbytes)
+        agent = RandomReflexAgent(block_size=['6'])
+        state = RoombaWorld.ObservableState(agent_location=(2, 2),
+                                            is_dirty=False)
+        moves = [agent.decide(state) for _ in range(6)]
+        assert moves == ['UP', 'DOWN', 'LEFT', 'RIGHT', 'UP', 'DOWN']
+        randbytes.assert_called_once_with(6)
+
+    @pytest.mark.parametrize('args', [{'seed': []}, {'seed': ['x']},
+                                      {'block_size': ['0']},
+                                      {'block_size': ['1', '2']}])
+    def test_rejects_bad_arguments(self, args):
+        with pytest.raises(ValueError):
+            RandomReflexAgent(**args)
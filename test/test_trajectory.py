@@ -0,0 +1,116 @@
+import io
+import random
+
+import pytest
+
+from roomba_world import (IncrementalCleanFloorEvaluator, RandomReflexAgent,
+                          RoombaWorld)
+from trajectory import *
+from vacuum_world import BasicVacuumWorld, CleanFloorEvaluator, run_experiment
+
+
+FLOOR_LINES = ['+.+\n', '+x+\n', '.++\n']
+
+
+def _roomba_world(path):
+    return RoombaWorld(agent_location=["0", "0"], floor_state_path=[path])
+
+
+def test_records_one_byte_per_step(floor_path):
+    file = io.BytesIO()
+    path = floor_path(FLOOR_LINES)
+    environment = RecordingEnvironment(_roomba_world(path), file)
+    for action in ('SUCK', 'RIGHT', 'DOWN', 'SUCK'):
+        environment.update(action)
+    environment.close()
+
+    (trajectory,) = read_trajectories(io.BytesIO(file.getvalue()))
+    assert len(file.getvalue()) == len(trajectory) + 18
+    assert trajectory.world == WORLD_ROOMBA
+    assert trajectory.start == (0, 0)
+    assert trajectory.actions() == ['SUCK', 'RIGHT', 'DOWN', 'SUCK']
+    assert trajectory.positions() == [(0, 0), (0, 1), (0, 1), (0, 1)]
+    assert trajectory.cleaned() == [(1, (0, 0))]
+
+
+def test_replay_rescores_roomba_world(floor_path):
+    random.seed(3)
+    file = io.BytesIO()
+    path = floor_path(FLOOR_LINES)
+    environment = RecordingEnvironment(_roomba_world(path), file)
+    evaluator = IncrementalCleanFloorEvaluator()
+    run_experiment(environment, RandomReflexAgent(), evaluator, steps=200,
+                   log_decisions=False)
+    environment.close()
+
+    (trajectory,) = read_trajectories(io.BytesIO(file.getvalue()))
+    replayed = IncrementalCleanFloorEvaluator()
+    replay(trajectory, _roomba_world(path), replayed)
+    assert len(trajectory) == 200
+    assert replayed.score == evaluator.score
+
+
+def test_replay_rescores_basic_world():
+    file = io.BytesIO()
+    for agent_location in ('A', 'B'):
+        environment = RecordingEnvironment(
+            BasicVacuumWorld(agent_location=[agent_location]), file)
+        for action in ('SUCK', 'LEFT', 'SUCK', 'RIGHT', 'SUCK'):
+            environment.update(action)
+        environment.close()
+
+    trajectories = read_trajectories(io.BytesIO(file.getvalue()))
+    assert [t.start for t in trajectories] == [(0, 0), (0, 1)]
+    assert trajectories[1].positions() == [(0, 1), (0, 0), (0, 0), (0, 1),
+                                           (0, 1)]
+    evaluator = CleanFloorEvaluator()
+    replay(trajectories[1], BasicVacuumWorld(agent_location=['B']),
+           evaluator)
+    assert evaluator.score == 1 + 1 + 2 + 2 + 2
+
+
+def test_replay_detects_divergence(floor_path):
+    file = io.BytesIO()
+    path = floor_path(FLOOR_LINES)
+    environment = RecordingEnvironment(_roomba_world(path), file)
+    environment.update('RIGHT')
+    environment.close()
+    (trajectory,) = read_trajectories(io.BytesIO(file.getvalue()))
+
+    blocked = floor_path(['+x\n'], name='blocked')
+    with pytest.raises(ValueError):
+        replay(trajectory, _roomba_world(blocked),
+               IncrementalCleanFloorEvaluator())
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        read_trajectories(io.BytesIO(b'not a trajectory at all'))
+
+
+def test_rejects_truncated_trajectory():
+    file = io.BytesIO()
+    writer = TrajectoryWriter(file, WORLD_BASIC, (0, 0))
+    writer.write('SUCK', moved=False, cleaned=True)
+    writer.close()
+    with pytest.raises(ValueError):
+        read_trajectories(io.BytesIO(file.getvalue()[:-1]))
+
+
+def test_refuses_worlds_whose_dirt_comes_back(floor_path):
+    for environment in (BasicVacuumWorld(dirt_rate=['0.5']),
+                        RoombaWorld(agent_location=["0", "0"],
+                                    floor_state_path=[floor_path(FLOOR_LINES)],
+                                    dirt_rate=['0.5'])):
+        with pytest.raises(ValueError):
+            RecordingEnvironment(environment, io.BytesIO())
+
+    file = io.BytesIO()
+    recording = RecordingEnvironment(BasicVacuumWorld(), file)
+    recording.update('SUCK')
+    recording.close()
+    file.seek(0)
+    trajectory, = read_trajectories(file)
+    with pytest.raises(ValueError):
+        replay(trajectory, BasicVacuumWorld(dirt_rate=['0.5']),
+               CleanFloorEvaluator())
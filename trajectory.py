@@ -0,0 +1,220 @@
+import struct
+
+
+MAGIC = b'VWTJ'
+VERSION = 1
+WORLD_BASIC = 0
+WORLD_ROOMBA = 1
+BASIC_LOCATIONS = ('A', 'B')
+
+ACTIONS = ('SUCK', 'UP', 'DOWN', 'LEFT', 'RIGHT')
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+ACTION_MASK = 0x07
+MOVED = 0x08
+CLEANED = 0x10
+
+MSG_BAD_HEADER = "Not a trajectory, or an unsupported version: {}"
+MSG_TRUNCATED = "Trajectory truncated: expected {} steps, got {}"
+MSG_REPLAY_MISMATCH = "Environment diverged from trajectory at t={}"
+MSG_DIRT_SCHEDULE = "Dirt that comes back is not recorded, so {} cannot " \
+                    "be recorded or replayed"
+
+_HEADER = struct.Struct('<4sBBiiI')
+_MOVES = {
+    'UP': (-1, 0),
+    'DOWN': (1, 0),
+    'LEFT': (0, -1),
+    'RIGHT': (0, 1)
+}
+
+
+class Trajectory(object):
+    """
+    One recorded run: the world kind, the agent's starting position and
+    one byte per step.
+
+    Each step byte holds the action code (an index into ACTIONS) in its
+    low three bits, the MOVED flag if the agent changed location, and
+    the CLEANED flag if the action removed dirt. Positions are (x, y)
+    pairs; in BasicVacuumWorld, x is 0 and y indexes its locations.
+    """
+
+    def __init__(self, world, start, steps):
+        self.world = world
+        self.start = start
+        self.steps = steps
+
+    def __len__(self):
+        return len(self.steps)
+
+    def actions(self):
+        """
+        The action taken at each step.
+        """
+        return [ACTIONS[step & ACTION_MASK] for step in self.steps]
+
+    def positions(self):
+        """
+        The agent's position after each step.
+        """
+        x, y = self.start
+        positions = []
+        for step in self.steps:
+            if step & MOVED:
+                dx, dy = _MOVES[ACTIONS[step & ACTION_MASK]]
+                x, y = x + dx, y + dy
+            positions.append((x, y))
+        return positions
+
+    def cleaned(self):
+        """
+        The positions cleaned, as (t, (x, y)) pairs.
+        """
+        return [(t, position) for t, (step, position)
+                in enumerate(zip(self.steps, self.positions()), start=1)
+                if step & CLEANED]
+
+
+class TrajectoryWriter(object):
+    """
+    Accumulates the steps of one run and writes them to a binary file
+    when closed. Several trajectories may be written to the same file.
+    """
+
+    def __init__(self, file, world, start):
+        """
+        :param file: binary file to write the trajectory to
+        :param world: WORLD_BASIC or WORLD_ROOMBA
+        :param start: the agent's starting (x, y) position
+        """
+        self._file = file
+        self._world = world
+        self._start = start
+        self._steps = bytearray()
+
+    def write(self, action, moved, cleaned):
+        """
+        Record one step.
+
+        :param action: the action taken, one of ACTIONS
+        :param moved: whether the agent changed location
+        :param cleaned: whether the action removed dirt
+        """
+        self._steps.append(ACTION_CODES[action]
+                           | (MOVED if moved else 0)
+                           | (CLEANED if cleaned else 0))
+
+    def close(self):
+        x, y = self._start
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self._world, x, y,
+                                      len(self._steps)))
+        self._file.write(self._steps)
+
+
+class RecordingEnvironment(object):
+    """
+    Wraps a BasicVacuumWorld or RoombaWorld and records every update to
+    a TrajectoryWriter. Everything else is passed through to the
+    wrapped environment.
+
+    Steps record only what the agent did, so worlds whose dirt comes
+    back (those with a dirt_schedule) are refused.
+    """
+
+    def __init__(self, environment, file):
+        """
+        :param environment: environment to record
+        :param file: binary file to write the trajectory to when the
+          recording is closed
+        """
+        _check_dirt_stays_clean(environment)
+        self._environment = environment
+        location, self._is_dirty = _observe(environment)
+        world, start = _position(location)
+        self._location = location
+        self._writer = TrajectoryWriter(file, world, start)
+
+    def __getattr__(self, name):
+        return getattr(self._environment, name)
+
+    @property
+    def wrapped(self):
+        return self._environment
+
+    def update(self, action):
+        self._environment.update(action)
+        location, is_dirty = _observe(self._environment)
+        self._writer.write(action,
+                           moved=location != self._location,
+                           cleaned=action == 'SUCK' and self._is_dirty)
+        self._location = location
+        self._is_dirty = is_dirty
+
+    def close(self):
+        self._writer.close()
+
+
+def read_trajectories(file):
+    """
+    Read every trajectory in a binary file.
+
+    :param file: binary file written by TrajectoryWriter
+    :return: list of Trajectory objects
+    """
+    trajectories = []
+    while True:
+        header = file.read(_HEADER.size)
+        if not header:
+            return trajectories
+        if len(header) < _HEADER.size:
+            raise ValueError(MSG_BAD_HEADER.format(header))
+        magic, version, world, x, y, length = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(MSG_BAD_HEADER.format(header))
+        steps = file.read(length)
+        if len(steps) != length:
+            raise ValueError(MSG_TRUNCATED.format(length, len(steps)))
+        trajectories.append(Trajectory(world, (x, y), steps))
+
+
+def replay(trajectory, environment, evaluator):
+    """
+    Re-run a trajectory's actions in an environment without an agent.
+
+    :param trajectory: Trajectory to replay
+    :param environment: environment in the same initial state as the
+      recorded one
+    :param evaluator: evaluator to score the replayed run
+    """
+    _check_dirt_stays_clean(environment)
+    location, _ = _observe(environment)
+    if _position(location) != (trajectory.world, trajectory.start):
+        raise ValueError(MSG_REPLAY_MISMATCH.format(0))
+    for t, step in enumerate(trajectory.steps, start=1):
+        environment.update(ACTIONS[step & ACTION_MASK])
+        new_location, _ = _observe(environment)
+        if (new_location != location) != bool(step & MOVED):
+            raise ValueError(MSG_REPLAY_MISMATCH.format(t))
+        location = new_location
+        evaluator.update(environment.state)
+
+
+def _check_dirt_stays_clean(environment):
+    # Looked up on the class, so that mocks do not seem to have one.
+    if isinstance(getattr(type(environment), 'dirt_schedule', None),
+                  property) and environment.dirt_schedule is not None:
+        raise ValueError(MSG_DIRT_SCHEDULE.format(
+            type(environment).__name__))
+
+
+def _observe(environment):
+    percept = environment.observable_state
+    if isinstance(percept, dict):
+        return percept["agent_location"], percept["is_dirty"]
+    return percept.agent_location, percept.is_dirty
+
+
+def _position(location):
+    if isinstance(location, str):
+        return WORLD_BASIC, (0, BASIC_LOCATIONS.index(location))
+    return WORLD_ROOMBA, tuple(location)
@@ -1,31 +1,95 @@
 import argparse
+import contextlib
+import hashlib
 import importlib
 import logging
+import logging.handlers
+import queue
+import random
+import statistics
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
+from dirt_schedule import DirtSchedule, parse_rate
+from memoizing_agent import MemoizingAgent
+from profiling import PhaseProfiler
+from trajectory import RecordingEnvironment
 
+
+NUM_STEPS = 1000
 NUM_TRIALS = 1000
+PERCENTILES = (5, 25, 50, 75, 95)
 LOGGER_NAME = "vacuum_world"
 LOG_LEVEL = logging.INFO
+DECISION_LOG_OFF = 'off'
+DECISION_LOG_QUEUE = 'queue'
+DECISION_LOG_STDOUT = 'stdout'
 
-MSG_AGENT_DECISION = "t={}\tAgent Decision: {}"
+MSG_AGENT_DECISION = "t=%d\tAgent Decision: %r"
 MSG_BAD_DIRT_STATUS_STR = "Invalid dirt status string: {}"
 MSG_COMPLETE = "Simulation complete."
-MSG_DESCRIPTION_AGENT = "Import path and class name for the agent"
-MSG_DESCRIPTION_ENVIRONMENT = "Import path and class name for the environment"
+MSG_DESCRIPTION_AGENT = "Import path and class name for the agent; " \
+                        "--agent-NAME VALUE... passes NAME=[VALUE...] to " \
+                        "its constructor"
+MSG_DESCRIPTION_ENVIRONMENT = "Import path and class name for the " \
+                              "environment; --env-NAME VALUE... passes " \
+                              "NAME=[VALUE...] to its constructor"
+MSG_DESCRIPTION_ALL_INITIAL_STATES = "Score the agent from every initial " \
+                                     "state of the environment and report " \
+                                     "the scores with their mean"
+MSG_DESCRIPTION_DECISION_LOG = "Where agent decisions are logged: " \
+                               "'stdout' writes each one as it is made, " \
+                               "'queue' hands them to a background " \
+                               "thread and 'off' skips them entirely " \
+                               "(default: stdout; --trials never logs " \
+                               "decisions)"
+MSG_DESCRIPTION_EARLY_TERMINATION = "Stop as soon as the environment " \
+                                    "reports that the rest of the score " \
+                                    "is determined, and credit the " \
+                                    "remaining steps in closed form"
 MSG_DESCRIPTION_EVALUATOR = "Import path and class name for the evaluator"
+MSG_DESCRIPTION_FAST_FORWARD = "Score the rest of the run without " \
+                               "simulating it once it starts repeating " \
+                               "(deterministic agents only)"
+MSG_DESCRIPTION_MEMOIZE = "Remember the agent's decision for each " \
+                          "percept; the agent must declare itself " \
+                          "deterministic"
+MSG_DESCRIPTION_PROFILE = "Time each phase of the experiment loop and " \
+                          "print a breakdown at the end (single runs only)"
+MSG_DESCRIPTION_RECORD_TRAJECTORY = "Append a binary trajectory of the " \
+                                    "run to this file"
 MSG_DESCRIPTION_PROGRAM = "Agent evaluator and environment simulator for " \
                           "the vacuum world described in AIMA, page 38."
+MSG_DESCRIPTION_SEED = "Base seed from which each trial's seed is derived"
+MSG_DESCRIPTION_STEPS = "Number of time steps per experiment " \
+                        "(default: {})".format(NUM_STEPS)
+MSG_DESCRIPTION_TRIALS = "Run N independent trials and report score " \
+                         "statistics (N defaults to {})".format(NUM_TRIALS)
+MSG_DESCRIPTION_WORKERS = "Number of worker processes for --trials " \
+                          "(defaults to one per CPU)"
+MSG_RECORDING_ERROR = "Cannot record trajectory: {}"
 MSG_EXPERIMENT_ERROR = "Error in {}: {}"
 MSG_ENVIRONMENT_INIT_ERROR = "Bad environment parameter: {}"
+MSG_AGENT_INIT_ERROR = "Bad agent parameter: {}"
 MSG_CLASS_NOT_FOUND = "Could not load {} \'{}\'"
 MSG_HELLO = "Vacuum World Simulator v1.0"
+MSG_INITIAL_STATE_SCORE = "{}\tScore: {}"
+MSG_INITIAL_STATES_MEAN = "Initial States: {}\tMean Score: {:.2f}"
 MSG_MODULE_NOT_LOADED = "Could not load agent module \'{}\'"
+MSG_NO_INITIAL_STATES = "Environment \'{}\' cannot list its initial states"
+MSG_NOT_WITH_INITIAL_STATES = "{} cannot be used with --all-initial-states"
+MSG_NOT_WITH_RECORDING = "{} cannot be used with --record-trajectory"
+MSG_NOT_WITH_TRIALS = "{} cannot be used with --trials"
+MSG_REQUIRES_TRIALS = "{} can only be used with --trials"
 MSG_SCORE = "Agent Score: {}"
+MSG_TRIAL_PERCENTILES = "Score Percentiles: {}"
+MSG_TRIAL_SCORES = "Trials: {}\tMean Score: {:.2f}\tStd Dev: {:.2f}" \
+                   "\tMin: {}\tMax: {}"
 MSG_UNRECOGNIZED_ARG = "Unrecognized argument: {}"
 
 DIRTY_VALUES = ('y', 'yes', 't', 'true', 'dirty')
 CLEAN_VALUES = ('n', 'no', 'f', 'false', 'clean')
+CUSTOM_ARG_PREFIXES = ('--env-', '--agent-')
 
 
 class ExperimentError(Exception):
@@ -34,23 +98,88 @@ class ExperimentError(Exception):
         self.cause = cause
 
 
-def run_experiment(environment, agent, evaluator):
+def run_experiment(environment, agent, evaluator, steps=NUM_STEPS,
+                   early_termination=False, log_decisions=True,
+                   profiler=None, fast_forward=False):
     """
-    Simulate an agent in the environment for 1000 steps.
-
-    Decisions are logged to the 'vacuum_world' logger.
+    Simulate an agent in the environment for a number of steps.
+
+    Decisions are logged to the 'vacuum_world' logger, unless that
+    logger would discard them anyway. Log messages are formatted only
+    when a handler emits them.
+
+    With early termination, the experiment stops after the first step
+    that leaves the environment quiescent, i.e. its is_quiescent
+    property is True: nothing that affects the score will change again.
+    Each remaining step is then worth what that last step was worth, and
+    the evaluator is credited with the total through its credit()
+    method. Environments or evaluators without these members always run
+    every step.
+
+    Environments whose class defines step(action), paired with
+    evaluators whose class defines start(state) and update_step(step),
+    take a faster path. Each step is one call that returns the next
+    percept and what changed, and the evaluator scores that change
+    without looking at the whole state again.
+
+    Fast-forwarding finds the point where a run starts repeating itself
+    and scores the rest of it without simulating it. It needs an
+    environment with a hashable state_key property that captures its
+    whole state (and is None if the environment's future is random), an
+    agent whose class declares deterministic = True
+    (its decision depends on nothing but the percept), and an evaluator
+    with a credit() method that scores each step by the state alone.
+    Once a state_key comes round again, the steps in between form a
+    cycle. The evaluator is credited with as many repeats of that cycle
+    as the remaining steps hold.
 
     :param environment: where the agent must perform
     :param agent: agent to evaluate
     :param evaluator: object that scores the agent against the
       performance measure
+    :param steps: number of time steps to simulate
+    :param early_termination: whether to stop once the environment is
+      quiescent
+    :param log_decisions: whether to log each decision
+    :param profiler: optional profiling.PhaseProfiler to time every
+      call to the environment, agent and evaluator
+    :param fast_forward: whether to skip to the end once the run cycles
     """
+    if profiler is not None:
+        environment, agent, evaluator = profiler.instrument(environment,
+                                                            agent,
+                                                            evaluator)
     logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(LOG_LEVEL)
-
-    for t in range(1, 1001):
+    log_decisions = log_decisions and logger.isEnabledFor(logging.INFO)
+    early_termination = early_termination \
+        and hasattr(environment, 'is_quiescent') \
+        and hasattr(evaluator, 'credit')
+    fast_forward = fast_forward \
+        and _can_fast_forward(environment, agent, evaluator)
+    # state_key -> steps taken when it was seen, and the points each
+    # step earned
+    seen = {}
+    gains = []
+    stepping = _has_step_api(environment, evaluator)
+    if stepping:
+        evaluator.start(environment.state)
+        percept = environment.observable_state
+
+    for t in range(1, steps + 1):
+        if fast_forward:
+            key = environment.state_key
+            start = seen.get(key)
+            if start is not None:
+                cycle = gains[start:]
+                repeats, rest = divmod(steps - t + 1, len(cycle))
+                evaluator.credit(repeats * sum(cycle) + sum(cycle[:rest]))
+                break
+            seen[key] = t - 1
+        if not stepping:
+            percept = environment.observable_state
         try:
-            decision = agent.decide(environment.observable_state)
+            decision = agent.decide(percept)
         # We assume that ValueError means the environment's input failed the
         # agent's validation. We further assume that the agent's validation is
         # correct and the environment's input was truly illegal.
@@ -58,14 +187,232 @@ def run_experiment(environment, agent, evaluator):
             raise ExperimentError('environment', e)
         except Exception as e:
             raise ExperimentError('agent', e)
-        logger.info(MSG_AGENT_DECISION.format(t, repr(decision)))
+        if log_decisions:
+            logger.info(MSG_AGENT_DECISION, t, decision)
         try:
-            environment.update(decision)
+            if stepping:
+                step = environment.step(decision)
+                percept = step.percept
+            else:
+                environment.update(decision)
         except ValueError as e:
             raise ExperimentError('agent', e)
         except Exception as e:
             raise ExperimentError('environment', e)
-        evaluator.update(environment.state)
+        if early_termination or fast_forward:
+            score = evaluator.score
+        if stepping:
+            evaluator.update_step(step)
+        else:
+            evaluator.update(environment.state)
+        if fast_forward:
+            gains.append(evaluator.score - score)
+        if early_termination and environment.is_quiescent:
+            evaluator.credit((evaluator.score - score) * (steps - t))
+            break
+
+
+def run_trials(environment_class, agent_class, evaluator_class,
+               environment_args, trials=NUM_TRIALS, workers=None, seed=None,
+               steps=NUM_STEPS, early_termination=False, agent_args=None,
+               memoize=False, fast_forward=False):
+    """
+    Run independent experiments, each with a freshly built environment,
+    agent and evaluator, across a pool of worker processes.
+
+    Each trial seeds the random module with its own seed, derived from
+    the base seed and the trial number. A seed in agent_args is derived
+    per trial in the same way, so agents with their own generators do
+    not all repeat the same moves. Decisions are not logged.
+
+    Environment classes may offer resources to share with the worker
+    processes: share_resources(environment_args) returns a context
+    manager whose value is passed to attach_shared_resources() in each
+    worker before it runs any trials.
+
+    :param environment_class: class to build each trial's environment
+    :param agent_class: class to build each trial's agent
+    :param evaluator_class: class to build each trial's evaluator
+    :param environment_args: keyword arguments for environment_class
+    :param trials: number of trials to run
+    :param workers: number of worker processes; None uses one per CPU
+      and 1 runs every trial in this process
+    :param seed: base seed; None seeds every trial unpredictably
+    :param steps: number of time steps per trial
+    :param early_termination: passed through to run_experiment
+    :param agent_args: keyword arguments for agent_class
+    :param memoize: whether to wrap each agent in a MemoizingAgent
+    :param fast_forward: passed through to run_experiment
+    :return: list with the evaluator's score for each trial
+    """
+    agent_args = agent_args or {}
+    jobs = [(environment_class, agent_class, evaluator_class,
+             environment_args, _trial_agent_args(agent_args, trial),
+             _derive_seed(seed, trial), steps, early_termination, memoize,
+             fast_forward)
+            for trial in range(trials)]
+    if workers == 1:
+        random_state = random.getstate()
+        try:
+            return [_run_trial(*job) for job in jobs]
+        finally:
+            random.setstate(random_state)
+    if hasattr(environment_class, 'share_resources'):
+        sharing = environment_class.share_resources(environment_args)
+        initializer = environment_class.attach_shared_resources
+    else:
+        sharing = contextlib.nullcontext()
+        initializer = None
+    with sharing as resources:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=initializer,
+                                 initargs=(resources,)) as executor:
+            return list(executor.map(_run_trial, *zip(*jobs)))
+
+
+def evaluate_initial_states(environment_class, agent_class,
+                            evaluator_class, steps=NUM_STEPS,
+                            agent_args=None):
+    """
+    Score an agent from every initial state of an environment.
+
+    Runs from different initial states often reach the same state after
+    a few steps. Where the environment has a state_key property, the
+    agent's class declares deterministic = True and the evaluator has a
+    credit() method, the points earned from each (state, steps left)
+    pair onwards are remembered, and later runs that reach a remembered
+    pair are credited with them instead of simulating the rest. Runs
+    that start cycling are fast-forwarded, as in run_experiment.
+
+    :param environment_class: class with an initial_states() static
+      method that lists the keyword arguments for each initial state
+    :param agent_class: class to build the agent for each run
+    :param evaluator_class: class to build the evaluator for each run
+    :param steps: number of time steps per run
+    :param agent_args: keyword arguments for agent_class
+    :return: list of (environment keyword arguments, score) pairs
+    """
+    agent_args = agent_args or {}
+    futures = {}
+    results = []
+    for environment_args in environment_class.initial_states():
+        environment = environment_class(**environment_args)
+        agent = agent_class(**agent_args)
+        evaluator = evaluator_class()
+        if _can_fast_forward(environment, agent, evaluator):
+            _run_sharing_futures(environment, agent, evaluator, steps,
+                                 futures)
+        else:
+            run_experiment(environment, agent, evaluator, steps=steps,
+                           log_decisions=False)
+        results.append((environment_args, evaluator.score))
+    return results
+
+
+def summarize_scores(scores):
+    """
+    Aggregate statistics of the scores from several trials.
+
+    :param scores: non-empty sequence of scores
+    :return: dictionary with keys "trials", "mean", "stdev", "min",
+      "max" and "percentiles", which maps each of PERCENTILES to its
+      score.
+    """
+    if len(scores) > 1:
+        cut_points = statistics.quantiles(scores, n=100, method='inclusive')
+        percentiles = {p: cut_points[p - 1] for p in PERCENTILES}
+        stdev = statistics.stdev(scores)
+    else:
+        percentiles = {p: scores[0] for p in PERCENTILES}
+        stdev = 0.0
+    return {
+        "trials": len(scores),
+        "mean": statistics.mean(scores),
+        "stdev": stdev,
+        "min": min(scores),
+        "max": max(scores),
+        "percentiles": percentiles
+    }
+
+
+def _run_trial(environment_class, agent_class, evaluator_class,
+               environment_args, agent_args, seed, steps, early_termination,
+               memoize, fast_forward):
+    random.seed(seed)
+    environment = environment_class(**environment_args)
+    agent = agent_class(**agent_args)
+    if memoize:
+        agent = MemoizingAgent(agent)
+    evaluator = evaluator_class()
+    run_experiment(environment, agent, evaluator, steps=steps,
+                   early_termination=early_termination, log_decisions=False,
+                   fast_forward=fast_forward)
+    return evaluator.score
+
+
+def _run_sharing_futures(environment, agent, evaluator, steps, futures):
+    # futures maps (state_key, steps left) to the points a run earns
+    # from there to its end. A run that revisits one of its own states
+    # is fast-forwarded as in run_experiment.
+    visited = []
+    seen = {}
+    gains = []
+    future = 0
+    for left in range(steps, 0, -1):
+        state_key = environment.state_key
+        key = (state_key, left)
+        if key in futures:
+            future = futures[key]
+            evaluator.credit(future)
+            break
+        start = seen.get(state_key)
+        if start is not None:
+            cycle = gains[start:]
+            repeats, rest = divmod(left, len(cycle))
+            future = repeats * sum(cycle) + sum(cycle[:rest])
+            evaluator.credit(future)
+            break
+        seen[state_key] = len(gains)
+        visited.append(key)
+        score = evaluator.score
+        run_experiment(environment, agent, evaluator, steps=1,
+                       log_decisions=False)
+        gains.append(evaluator.score - score)
+    for key, gain in zip(reversed(visited), reversed(gains)):
+        future += gain
+        futures[key] = future
+
+
+def _can_fast_forward(environment, agent, evaluator):
+    # An environment whose future is random has no state_key to offer.
+    return isinstance(getattr(type(environment), 'state_key', None),
+                      property) \
+        and environment.state_key is not None \
+        and getattr(type(agent), 'deterministic', False) is True \
+        and hasattr(evaluator, 'credit')
+
+
+def _has_step_api(environment, evaluator):
+    # Looked up on the classes, so that mocks and pass-through wrappers,
+    # which answer to any attribute, keep to the four-call protocol.
+    return callable(getattr(type(environment), 'step', None)) \
+        and callable(getattr(type(evaluator), 'start', None)) \
+        and callable(getattr(type(evaluator), 'update_step', None))
+
+
+def _trial_agent_args(agent_args, trial):
+    if 'seed' not in agent_args:
+        return agent_args
+    seed = ' '.join(agent_args['seed'])
+    return dict(agent_args, seed=[str(_derive_seed(seed, trial))])
+
+
+def _derive_seed(seed, trial):
+    if seed is None:
+        return None
+    digest = hashlib.blake2b("{}:{}".format(seed, trial).encode(),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
 
 
 class BasicVacuumWorld(object):
@@ -85,7 +432,8 @@ class BasicVacuumWorld(object):
     locations = ['A', 'B']
     actions = ['LEFT', 'RIGHT', 'SUCK']
 
-    def __init__(self, agent_location=('A',), dirt_status=('t', 't')):
+    def __init__(self, agent_location=('A',), dirt_status=('t', 't'),
+                 dirt_rate=None):
         """
         Initialize a new environment.
 
@@ -93,6 +441,10 @@ class BasicVacuumWorld(object):
           starting location of the agent as its element.
         :param dirt_status: A two-element list of strings
           denoting whether there is dirt at each location ['A', 'B'].
+        :param dirt_rate: Optional list of strings with the probability
+          that a clean location gets dirty again on each step: one for
+          both locations, or one for each of ['A', 'B']. Without it,
+          clean locations stay clean.
         """
         if len(agent_location) != 1:
             raise ValueError(agent_location)
@@ -108,6 +460,7 @@ class BasicVacuumWorld(object):
         self._dirt_status = {location: status
                              for location, status in dirt_status_tuples}
         self._agent_location = agent_location
+        self._schedule = self._schedule_dirt(dirt_rate)
 
     @property
     def state(self):
@@ -126,6 +479,45 @@ class BasicVacuumWorld(object):
             "dirt_status": self._dirt_status
         }
 
+    @staticmethod
+    def initial_states():
+        """
+        Keyword arguments for each of the eight initial states: every
+        agent location with every combination of dirt.
+        """
+        return [{'agent_location': [location],
+                 'dirt_status': [dirt_a, dirt_b]}
+                for location in BasicVacuumWorld.locations
+                for dirt_a in ('dirty', 'clean')
+                for dirt_b in ('dirty', 'clean')]
+
+    @property
+    def state_key(self):
+        """
+        The whole state as a hashable value, equal for equal states, or
+        None when dirt comes back at random.
+        """
+        if self._schedule is not None:
+            return None
+        return (self._agent_location, self._dirt_status['A'],
+                self._dirt_status['B'])
+
+    @property
+    def dirt_schedule(self):
+        """
+        The DirtSchedule of the dirt that comes back, or None if
+        cleaned locations stay clean.
+        """
+        return self._schedule
+
+    @property
+    def is_quiescent(self):
+        """
+        True once every location is clean and no dirt can come back,
+        so nothing that affects the score can change after this.
+        """
+        return not any(self._dirt_status.values()) and not self._schedule
+
     @property
     def observable_state(self):
         """
@@ -150,6 +542,9 @@ class BasicVacuumWorld(object):
           'LEFT', 'RIGHT', and 'SUCK'.
         """
         if action == 'SUCK':
+            if self._schedule is not None \
+                    and self._dirt_status[self._agent_location]:
+                self._schedule.clean(self._agent_location)
             self._dirt_status[self._agent_location] = False
         elif action == 'RIGHT':
             self._agent_location = 'B'
@@ -157,6 +552,25 @@ class BasicVacuumWorld(object):
             self._agent_location = 'A'
         else:
             raise ValueError(action)
+        if self._schedule is not None:
+            for location in self._schedule.advance():
+                self._dirt_status[location] = True
+
+    def _schedule_dirt(self, dirt_rate):
+        if dirt_rate is None:
+            return None
+        if len(dirt_rate) == 1:
+            dirt_rate = list(dirt_rate) * len(BasicVacuumWorld.locations)
+        if len(dirt_rate) != len(BasicVacuumWorld.locations):
+            raise ValueError(dirt_rate)
+        rates = dict(zip(BasicVacuumWorld.locations,
+                         map(parse_rate, dirt_rate)))
+        if not any(rates.values()):
+            return None
+        schedule = DirtSchedule(rates.get)
+        schedule.start(location for location, dirty
+                       in self._dirt_status.items() if not dirty)
+        return schedule
 
     @staticmethod
     def _convert_to_dirt_status(string):
@@ -189,6 +603,14 @@ class CleanFloorEvaluator(object):
         """
         self._score += list(state["dirt_status"].values()).count(False)
 
+    def credit(self, points):
+        """
+        Add points earned in steps that were not simulated.
+
+        :param points: number of points to add to the score
+        """
+        self._score += points
+
     @property
     def score(self):
         """
@@ -202,6 +624,8 @@ class SuckyAgent(object):
     """
     Vacuum World agent that only chooses the SUCK action.
     """
+    deterministic = True
+
     def decide(self, _):
         """
         Suck up the dirt, if there is any.
@@ -212,15 +636,31 @@ class SuckyAgent(object):
 
 
 def main():
+    # Parse arguments
+    args, environment_args, agent_args = _parse_arguments()
+
     # Set up logging
     logger = logging.getLogger()
     handler = logging.StreamHandler(stream=sys.stdout)
     logger.setLevel(LOG_LEVEL)
+    listener = None
+    if args.decision_log == DECISION_LOG_QUEUE:
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        handler = _DeferredQueueHandler(log_queue)
+        listener.start()
     logger.addHandler(handler)
 
-    # Parse arguments
-    args, environment_args = _parse_arguments()
+    try:
+        return _main(args, environment_args, agent_args)
+    finally:
+        if listener is not None:
+            logger.removeHandler(handler)
+            listener.stop()
 
+
+def _main(args, environment_args, agent_args):
+    logger = logging.getLogger()
     logger.info(MSG_HELLO)
 
     # Load classes for actors
@@ -228,28 +668,130 @@ def main():
     agent_class = _try_load_class(args.agent, 'agent')
     evaluator_class = _try_load_class(args.evaluator, 'evaluator')
 
-    # Instantiate actors
+    # Instantiate actors. Trials build their own agents in the worker
+    # processes; this one only checks the agent parameters up front, so
+    # that mistakes in them are not reported as environment errors.
+    agent = _try_init_agent(agent_class, agent_args, args.memoize)
+    if agent is None:
+        return 1
+    if args.trials is not None:
+        return _main_trials(args, environment_args, agent_args,
+                            environment_class, agent_class, evaluator_class)
+    if args.all_initial_states:
+        return _main_initial_states(args, agent_args, environment_class,
+                                    agent_class, evaluator_class)
+
     evaluator = evaluator_class()
-    agent = agent_class()
     try:
         environment = environment_class(**environment_args)
     except ValueError as e:
         logger.error(MSG_ENVIRONMENT_INIT_ERROR.format(e.args[0]))
         return 1
 
+    if args.record_trajectory is not None:
+        trajectory_file = open(args.record_trajectory, 'ab')
+        try:
+            environment = RecordingEnvironment(environment, trajectory_file)
+        except ValueError as e:
+            trajectory_file.close()
+            logger.error(MSG_RECORDING_ERROR.format(e.args[0]))
+            return 1
+
+    profiler = PhaseProfiler() if args.profile else None
+
     # Do the thing
     try:
         run_experiment(environment,
                        agent,
-                       evaluator)
+                       evaluator,
+                       steps=args.steps,
+                       early_termination=args.early_termination,
+                       fast_forward=args.fast_forward,
+                       log_decisions=args.decision_log != DECISION_LOG_OFF,
+                       profiler=profiler)
 
         logger.info(MSG_COMPLETE)
     except ExperimentError as e:
         logger.error(MSG_EXPERIMENT_ERROR.format(e.component, repr(e.cause)))
+    finally:
+        if args.record_trajectory is not None:
+            environment.close()
+            trajectory_file.close()
 
     # Report results
     score = evaluator.score
     logger.info(MSG_SCORE.format(score))
+    if profiler is not None:
+        for line in profiler.report():
+            logger.info(line)
+
+
+def _main_initial_states(args, agent_args, environment_class, agent_class,
+                         evaluator_class):
+    logger = logging.getLogger()
+    if not hasattr(environment_class, 'initial_states'):
+        logger.error(MSG_NO_INITIAL_STATES.format(args.environment))
+        return 1
+    try:
+        results = evaluate_initial_states(environment_class, agent_class,
+                                          evaluator_class, steps=args.steps,
+                                          agent_args=agent_args)
+    except ExperimentError as e:
+        logger.error(MSG_EXPERIMENT_ERROR.format(e.component, repr(e.cause)))
+        return 1
+    logger.info(MSG_COMPLETE)
+
+    for environment_args, score in results:
+        description = ' '.join('{}={}'.format(name, ','.join(values))
+                               for name, values in environment_args.items())
+        logger.info(MSG_INITIAL_STATE_SCORE.format(description, score))
+    scores = [score for _, score in results]
+    logger.info(MSG_INITIAL_STATES_MEAN.format(len(scores),
+                                               statistics.mean(scores)))
+
+
+def _try_init_agent(agent_class, agent_args, memoize):
+    try:
+        agent = agent_class(**agent_args)
+        return MemoizingAgent(agent) if memoize else agent
+    except (TypeError, ValueError) as e:
+        logging.getLogger().error(MSG_AGENT_INIT_ERROR.format(e.args[0]))
+        return None
+
+
+def _main_trials(args, environment_args, agent_args, environment_class,
+                 agent_class, evaluator_class):
+    logger = logging.getLogger()
+    try:
+        scores = run_trials(environment_class, agent_class, evaluator_class,
+                            environment_args, trials=args.trials,
+                            workers=args.workers, seed=args.seed,
+                            steps=args.steps,
+                            early_termination=args.early_termination,
+                            agent_args=agent_args, memoize=args.memoize,
+                            fast_forward=args.fast_forward)
+    except ValueError as e:
+        logger.error(MSG_ENVIRONMENT_INIT_ERROR.format(e.args[0]))
+        return 1
+    except ExperimentError as e:
+        logger.error(MSG_EXPERIMENT_ERROR.format(e.component, repr(e.cause)))
+        return 1
+    logger.info(MSG_COMPLETE)
+
+    summary = summarize_scores(scores)
+    logger.info(MSG_TRIAL_SCORES.format(summary["trials"], summary["mean"],
+                                        summary["stdev"], summary["min"],
+                                        summary["max"]))
+    percentiles = ' '.join('p{}={}'.format(p, score)
+                           for p, score in summary["percentiles"].items())
+    logger.info(MSG_TRIAL_PERCENTILES.format(percentiles))
+
+
+def _positive_int(string):
+    value = int(string)
+    if value < 1:
+        raise argparse.ArgumentTypeError(string)
+    return value
 
 
 def _strtobool(string):
@@ -295,27 +837,30 @@ def _load_class(agent_path):
     return agent_class
 
 
-def _extract_environment_args(args):
-    environment_args = {}
+def _extract_custom_args(args):
+    custom_args = {prefix: {} for prefix in CUSTOM_ARG_PREFIXES}
     while len(args) > 0:
-        if not args[0].startswith('--env-'):
+        prefix = _custom_arg_prefix(args[0])
+        if prefix is None:
             raise ValueError(args[0])
-        param_name = args[0][6:].replace('-', '_')
+        param_name = args[0][len(prefix):].replace('-', '_')
         rest = args[1:]
-        if len(rest) > 0:
-            i = 0
-            while i < len(rest):
-                element = rest[i]
-                if element.startswith('--env-'):
-                    break
-                i += 1
-            environment_args[param_name] = rest[:i]
-            args = rest[i:]
-        else:
-            environment_args[param_name] = []
-            args = []
+        i = 0
+        while i < len(rest):
+            if _custom_arg_prefix(rest[i]) is not None:
+                break
+            i += 1
+        custom_args[prefix][param_name] = rest[:i]
+        args = rest[i:]
+
+    return tuple(custom_args[prefix] for prefix in CUSTOM_ARG_PREFIXES)
 
-    return environment_args
+
+def _custom_arg_prefix(arg):
+    for prefix in CUSTOM_ARG_PREFIXES:
+        if arg.startswith(prefix):
+            return prefix
+    return None
 
 
 def _parse_arguments():
@@ -331,21 +876,89 @@ def _parse_arguments():
                             default='CleanFloorEvaluator',
                             metavar='EVALUATOR_CLASS',
                             help=MSG_DESCRIPTION_EVALUATOR)
+    arg_parser.add_argument('--steps', type=_positive_int, required=False,
+                            default=NUM_STEPS, metavar='N',
+                            help=MSG_DESCRIPTION_STEPS)
+    arg_parser.add_argument('--early-termination', action='store_true',
+                            help=MSG_DESCRIPTION_EARLY_TERMINATION)
+    arg_parser.add_argument('--decision-log', type=str, required=False,
+                            default=DECISION_LOG_STDOUT,
+                            choices=(DECISION_LOG_STDOUT, DECISION_LOG_QUEUE,
+                                     DECISION_LOG_OFF),
+                            help=MSG_DESCRIPTION_DECISION_LOG)
+    arg_parser.add_argument('--all-initial-states', action='store_true',
+                            help=MSG_DESCRIPTION_ALL_INITIAL_STATES)
+    arg_parser.add_argument('--fast-forward', action='store_true',
+                            help=MSG_DESCRIPTION_FAST_FORWARD)
+    arg_parser.add_argument('--memoize', action='store_true',
+                            help=MSG_DESCRIPTION_MEMOIZE)
+    arg_parser.add_argument('--profile', action='store_true',
+                            help=MSG_DESCRIPTION_PROFILE)
+    arg_parser.add_argument('--record-trajectory', type=str, required=False,
+                            default=None, metavar='PATH',
+                            help=MSG_DESCRIPTION_RECORD_TRAJECTORY)
+    arg_parser.add_argument('--trials', type=_positive_int, required=False,
+                            nargs='?', const=NUM_TRIALS, default=None,
+                            metavar='N', help=MSG_DESCRIPTION_TRIALS)
+    arg_parser.add_argument('--workers', type=_positive_int, required=False,
+                            default=None, metavar='K',
+                            help=MSG_DESCRIPTION_WORKERS)
+    arg_parser.add_argument('--seed', type=int, required=False, default=None,
+                            help=MSG_DESCRIPTION_SEED)
     (args, custom_args) = arg_parser.parse_known_args()
+    if args.trials is None:
+        for option, value in (('--workers', args.workers),
+                              ('--seed', args.seed)):
+            if value is not None:
+                arg_parser.error(MSG_REQUIRES_TRIALS.format(option))
+    else:
+        for option, value in (('--profile', args.profile),
+                              ('--record-trajectory',
+                               args.record_trajectory is not None)):
+            if value:
+                arg_parser.error(MSG_NOT_WITH_TRIALS.format(option))
+    if args.record_trajectory is not None:
+        # A trajectory holds only the simulated steps, so the steps an
+        # early end or a fast-forward credits could not be replayed.
+        for option, value in (('--early-termination',
+                               args.early_termination),
+                              ('--fast-forward', args.fast_forward)):
+            if value:
+                arg_parser.error(MSG_NOT_WITH_RECORDING.format(option))
 
     try:
-        environment_args = _extract_environment_args(custom_args)
+        environment_args, agent_args = _extract_custom_args(custom_args)
     except ValueError as e:
         message = MSG_UNRECOGNIZED_ARG.format(e.args[0])
         arg_parser.error(message)
         raise SystemError("I have reached unreachable code.")
 
-    return args, environment_args
+    if args.all_initial_states:
+        for option, value in (('--trials', args.trials is not None),
+                              ('--memoize', args.memoize),
+                              ('--profile', args.profile),
+                              ('--record-trajectory',
+                               args.record_trajectory is not None),
+                              ('--env-* arguments', environment_args)):
+            if value:
+                arg_parser.error(MSG_NOT_WITH_INITIAL_STATES.format(option))
+
+    return args, environment_args, agent_args
 
 
 class _ClassNotFoundError(Exception):
     pass
 
 
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted, leaving all
+    formatting to the listener thread. Only safe with an in-process
+    queue.
+    """
+    def prepare(self, record):
+        return record
+
+
 if __name__ == '__main__':
     main()